@@ -1,18 +1,31 @@
 """
 FastAPI application for feedback analysis.
 """
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from jinja2 import FileSystemBytecodeCache
+from jinja2.utils import LRUCache
+from typing import Any, Dict, List, Optional
+from functools import lru_cache
+import asyncio
+import os
+import aiofiles
 import pandas as pd
 from pathlib import Path
 import json
 from src.analysis.analyzer import FeedbackAnalyzer
-from src.config.settings import RAW_DATA_DIR
+from src.config.settings import (
+    RAW_DATA_DIR,
+    DEBUG,
+    UPLOAD_CHUNK_SIZE,
+    TEMPLATE_CACHE_DIR,
+    TEMPLATE_CACHE_SIZE
+)
 from src.models.llm import LLMInterface
+from src.models.batcher import RequestBatcher
 
 app = FastAPI(
     title="Feedback Analysis API",
@@ -32,23 +45,110 @@ app.add_middleware(
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Templates
+# Templates, with compiled bytecode cached on disk across processes
+TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 templates = Jinja2Templates(directory="templates")
+templates.env.bytecode_cache = FileSystemBytecodeCache(directory=str(TEMPLATE_CACHE_DIR))
+templates.env.cache = LRUCache(TEMPLATE_CACHE_SIZE)
+# Only check templates for changes on disk while developing
+templates.env.auto_reload = DEBUG
 
 # Initialize analyzer with default model
 analyzer = FeedbackAnalyzer()
 
+# Analyzers are expensive to build (they load model weights), so keep one per model key
+_ANALYZERS: Dict[str, FeedbackAnalyzer] = {analyzer.llm.model_key: analyzer}
+_ANALYZERS_LOCK = asyncio.Lock()
+
+async def start_batching(analyzer: FeedbackAnalyzer) -> None:
+    """
+    Route an analyzer's LLM calls through a dynamic request batcher.
+    
+    Args:
+        analyzer: Analyzer whose LLM calls should be batched across requests
+    """
+    if analyzer.llm.batcher is None:
+        analyzer.llm.batcher = RequestBatcher(analyzer.llm.generate_batch)
+    await analyzer.llm.batcher.start()
+
+@app.on_event("startup")
+async def startup():
+    """Start request batching for the analyzers loaded at import time."""
+    app.state.batching = True
+    for cached_analyzer in _ANALYZERS.values():
+        await start_batching(cached_analyzer)
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop request batching, fail any requests still queued and close remote connections."""
+    app.state.batching = False
+    for cached_analyzer in _ANALYZERS.values():
+        if cached_analyzer.llm.batcher is not None:
+            await cached_analyzer.llm.batcher.stop()
+    
+    # Analyzers can share an interface, and a backend can only be closed once
+    remotes = {
+        id(cached_analyzer.llm.remote): cached_analyzer.llm.remote
+        for cached_analyzer in _ANALYZERS.values()
+        if cached_analyzer.llm.remote is not None
+    }
+    for remote in remotes.values():
+        # close() waits for the backend's own event loop thread to finish
+        await asyncio.to_thread(remote.close)
+
+async def get_analyzer(model_key: str) -> FeedbackAnalyzer:
+    """
+    Get the cached analyzer for a model, creating it on first use.
+    
+    Args:
+        model_key: Key of the model configuration to use
+        
+    Returns:
+        Shared FeedbackAnalyzer instance for the model
+    """
+    if model_key in _ANALYZERS:
+        return _ANALYZERS[model_key]
+    async with _ANALYZERS_LOCK:
+        # Another request may have loaded the model while we waited for the lock
+        if model_key not in _ANALYZERS:
+            _ANALYZERS[model_key] = await asyncio.to_thread(
+                FeedbackAnalyzer,
+                model_key=model_key
+            )
+            if getattr(app.state, "batching", False):
+                await start_batching(_ANALYZERS[model_key])
+        return _ANALYZERS[model_key]
+
+@lru_cache(maxsize=8)
+def _cached_class_analysis(path: str, mtime: float) -> Dict[str, Any]:
+    """
+    Run the dashboard's class-level analysis once per version of a file.
+    
+    Args:
+        path: Path of the CSV file to analyze
+        mtime: Modification time of the file, so edits invalidate the cache
+        
+    Returns:
+        Class-level analysis of the file
+    """
+    return analyzer.analyze_class_feedback(
+        [path],
+        group_col="group",
+        student_col="student",
+        feedback_col="feedback",
+        date_col="date"
+    )
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Serve the dashboard page."""
     try:
-        # Get class-level analysis for the dashboard
-        analysis = analyzer.analyze_class_feedback(
-            [str(RAW_DATA_DIR / "e2e_test_feedback.csv")],
-            group_col="group",
-            student_col="student",
-            feedback_col="feedback",
-            date_col="date"
+        # Get class-level analysis for the dashboard, recomputed only when the file changes
+        path = str(RAW_DATA_DIR / "e2e_test_feedback.csv")
+        analysis = await asyncio.to_thread(
+            _cached_class_analysis,
+            path,
+            os.path.getmtime(path)
         )
         
         # Prepare data for charts
@@ -107,9 +207,13 @@ async def upload_feedback(file: UploadFile = File(...), model: str = "llama-3.1-
     try:
         # Save the uploaded file
         file_path = RAW_DATA_DIR / file.filename
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        async with aiofiles.open(file_path, "wb") as buffer:
+            # Copy in fixed-size chunks so memory stays bounded for large uploads
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await buffer.write(chunk)
         
         # Redirect to dashboard
         return RedirectResponse(url="/", status_code=303)
@@ -142,9 +246,10 @@ async def get_class_analysis(
     Get class-level analysis of feedback data.
     """
     try:
-        # Create new analyzer with specified model
-        analyzer = FeedbackAnalyzer(model_key=model_key)
-        analysis = analyzer.analyze_class_feedback(
+        # Reuse the cached analyzer for the specified model
+        analyzer = await get_analyzer(model_key)
+        analysis = await asyncio.to_thread(
+            analyzer.analyze_class_feedback,
             files,
             group_col,
             student_col,
@@ -169,9 +274,10 @@ async def get_group_analysis(
     Get group-level analysis of feedback data.
     """
     try:
-        # Create new analyzer with specified model
-        analyzer = FeedbackAnalyzer(model_key=model_key)
-        analysis = analyzer.analyze_group_feedback(
+        # Reuse the cached analyzer for the specified model
+        analyzer = await get_analyzer(model_key)
+        analysis = await asyncio.to_thread(
+            analyzer.analyze_group_feedback,
             files,
             group_name,
             group_col,
@@ -199,9 +305,10 @@ async def get_student_analysis(
     Get student-level analysis of feedback data.
     """
     try:
-        # Create new analyzer with specified model
-        analyzer = FeedbackAnalyzer(model_key=model_key)
-        analysis = analyzer.analyze_student_feedback(
+        # Reuse the cached analyzer for the specified model
+        analyzer = await get_analyzer(model_key)
+        analysis = await asyncio.to_thread(
+            analyzer.analyze_student_feedback,
             files,
             group_name,
             student_name,
@@ -223,23 +330,31 @@ async def compare_feedback(
     model_key: str = "llama-3.1-8b",
     group_col: str = "group",
     student_col: str = "student",
-    feedback_col: str = "feedback"
+    feedback_col: str = "feedback",
+    # A repeated query parameter, one reference text per feedback entry for BERTScore
+    references: Optional[List[str]] = Query(None)
 ):
     """
     Compare feedback quality across different sources.
     """
     try:
-        # Create new analyzer with specified model
-        analyzer = FeedbackAnalyzer(model_key=model_key)
-        comparison = analyzer.compare_feedback_quality(
+        # Reuse the cached analyzer for the specified model
+        analyzer = await get_analyzer(model_key)
+        comparison = await asyncio.to_thread(
+            analyzer.compare_feedback_quality,
             files,
             group_name,
             student_name,
             group_col,
             student_col,
-            feedback_col
+            feedback_col,
+            references
         )
         return comparison
+    except ValueError as e:
+        # Request data that does not fit the feedback, such as an unknown
+        # student or references not paired one per feedback entry
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
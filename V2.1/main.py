@@ -1,19 +1,45 @@
 import pandas as pd
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
 import torch
 from pathlib import Path
 import os
 from dotenv import load_dotenv
 import sys
+import csv
+from itertools import islice
 
 # Load environment variables
 load_dotenv()
 
+# Number of students whose feedback is generated in a single model.generate call
+BATCH_SIZE = 32
+
+# Weight quantization: "none" (bfloat16), "int8" or "int4"
+QUANTIZATION = os.getenv('QUANTIZATION', 'none').lower()
+
+# Optional small draft model for speculative decoding, e.g. "meta-llama/Llama-3.2-1B-Instruct"
+DRAFT_MODEL_NAME = os.getenv('DRAFT_MODEL_NAME', '')
+
+def get_quantization_config():
+    """Build the bitsandbytes config for the selected QUANTIZATION mode"""
+    if QUANTIZATION == "int8":
+        return BitsAndBytesConfig(load_in_8bit=True)
+    if QUANTIZATION == "int4":
+        return BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_compute_dtype=torch.bfloat16,
+            bnb_4bit_quant_type="nf4"
+        )
+    if QUANTIZATION != "none":
+        print(f"Error: Unknown QUANTIZATION '{QUANTIZATION}', expected none, int8 or int4")
+        sys.exit(1)
+    return None
+
 def load_model():
     """Load the Llama 3 model and tokenizer"""
     try:
         model_name = "meta-llama/Llama-3.1-8B-Instruct"  # Using Llama 3.1 8B model
-        print(f"Loading model {model_name}...")
+        print(f"Loading model {model_name} (quantization: {QUANTIZATION})...")
         
         # Get the Hugging Face token
         token = os.getenv('HUGGINGFACE_TOKEN')
@@ -22,10 +48,16 @@ def load_model():
             sys.exit(1)
             
         tokenizer = AutoTokenizer.from_pretrained(model_name, token=token)
+        # Causal LMs must be left-padded so every prompt in a batch ends at the
+        # position where generation starts
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
         model = AutoModelForCausalLM.from_pretrained(
             model_name,
             token=token,
-            torch_dtype=torch.float16,  # Use half precision for memory efficiency
+            torch_dtype=torch.bfloat16,  # Half precision with fp32 range for memory efficiency
+            quantization_config=get_quantization_config(),
             device_map="auto"  # Automatically handle model placement
         )
         print("Model loaded successfully!")
@@ -35,10 +67,28 @@ def load_model():
         print("Please make sure you have the correct model name and sufficient memory.")
         sys.exit(1)
 
-def analyze_feedback(feedback_text, model, tokenizer):
-    """Analyze feedback text using the model"""
+def load_draft_model():
+    """Load the draft model used for speculative decoding, if one is configured"""
+    if not DRAFT_MODEL_NAME:
+        return None
     try:
-        prompt = f"""Analyze the following student feedback and provide a summary based on these criteria:
+        print(f"Loading draft model {DRAFT_MODEL_NAME}...")
+        draft_model = AutoModelForCausalLM.from_pretrained(
+            DRAFT_MODEL_NAME,
+            token=os.getenv('HUGGINGFACE_TOKEN'),
+            torch_dtype=torch.bfloat16,
+            device_map="auto"
+        )
+        print("Draft model loaded successfully!")
+        return draft_model
+    except Exception as e:
+        print(f"Error loading draft model: {str(e)}")
+        print("Continuing without speculative decoding.")
+        return None
+
+def build_prompt(feedback_text):
+    """Build the analysis prompt for a single feedback text"""
+    return f"""Analyze the following student feedback and provide a summary based on these criteria:
         1. Technical Skills
         2. Communication
         3. Team Collaboration
@@ -47,14 +97,51 @@ def analyze_feedback(feedback_text, model, tokenizer):
 
         Please provide a brief summary for each criterion."""
 
-        inputs = tokenizer(prompt, return_tensors="pt")
-        outputs = model.generate(**inputs, max_length=200, num_return_sequences=1)
-        response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        
-        return response
+def analyze_feedback_batch(feedback_texts, model, tokenizer, draft_model=None):
+    """Analyze a batch of feedback texts with a single model.generate call"""
+    try:
+        prompts = [build_prompt(feedback_text) for feedback_text in feedback_texts]
+        generation_kwargs = {
+            "max_new_tokens": 200,
+            "do_sample": False,
+            "use_cache": True,
+            "pad_token_id": tokenizer.eos_token_id
+        }
+
+        if draft_model is not None:
+            # Assisted generation only supports one sequence at a time
+            responses = []
+            for prompt in prompts:
+                inputs = tokenizer(
+                    prompt,
+                    return_tensors="pt",
+                    truncation=True,
+                    max_length=512
+                ).to(model.device)
+                outputs = model.generate(
+                    **inputs,
+                    assistant_model=draft_model,
+                    **generation_kwargs
+                )
+                responses.append(tokenizer.decode(outputs[0], skip_special_tokens=True))
+            return responses
+
+        inputs = tokenizer(
+            prompts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=512
+        ).to(model.device)
+        outputs = model.generate(**inputs, **generation_kwargs)
+        return tokenizer.batch_decode(outputs, skip_special_tokens=True)
     except Exception as e:
-        print(f"Error analyzing feedback: {str(e)}")
-        return "Error analyzing feedback"
+        print(f"Error analyzing feedback batch: {str(e)}")
+        return ["Error analyzing feedback"] * len(feedback_texts)
+
+def analyze_feedback(feedback_text, model, tokenizer, draft_model=None):
+    """Analyze feedback text using the model"""
+    return analyze_feedback_batch([feedback_text], model, tokenizer, draft_model)[0]
 
 def process_feedback_file(input_file):
     """Process the feedback CSV file and generate summaries"""
@@ -77,30 +164,34 @@ def process_feedback_file(input_file):
         
         # Load the model
         model, tokenizer = load_model()
+        draft_model = load_draft_model()
         
-        # Process each student's feedback
-        results = []
+        # Process the feedback in batches of students, streaming results to disk
+        output_file = output_dir / "feedback_analysis.csv"
         total_students = len(df)
+        # Plain (student_id, feedback_text) tuples, without building a Series per row
+        rows = df[['student_id', 'feedback_text']].itertuples(index=False, name=None)
+        processed = 0
         
         print(f"\nProcessing feedback for {total_students} students...")
-        for index, row in df.iterrows():
-            student_id = row['student_id']
-            feedback = row['feedback_text']
-            
-            print(f"\nProcessing student {student_id} ({index + 1}/{total_students})...")
-            print(f"Feedback: {feedback[:100]}...")  # Print first 100 chars of feedback
+        # 1 MiB write buffer: rows reach disk in large blocks, no flush inside the loop
+        with open(output_file, "w", newline="", buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(['student_id', 'feedback_summary'])
             
-            analysis = analyze_feedback(feedback, model, tokenizer)
-            print(f"Analysis complete for student {student_id}")
-            
-            results.append({
-                'student_id': student_id,
-                'feedback_summary': analysis
-            })
+            while True:
+                batch = list(islice(rows, BATCH_SIZE))
+                if not batch:
+                    break
+                student_ids, feedbacks = zip(*batch)
+                
+                print(f"\nProcessing students {processed + 1}-{processed + len(batch)} ({total_students} total)...")
+                analyses = analyze_feedback_batch(list(feedbacks), model, tokenizer, draft_model)
+                processed += len(batch)
+                print(f"Analysis complete for students {', '.join(str(sid) for sid in student_ids)}")
+                
+                writer.writerows(zip(student_ids, analyses))
         
-        # Save results to CSV
-        output_file = output_dir / "feedback_analysis.csv"
-        pd.DataFrame(results).to_csv(output_file, index=False)
         print(f"\nAnalysis complete! Results saved to {output_file}")
         
     except Exception as e:
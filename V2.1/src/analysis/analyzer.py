@@ -8,16 +8,24 @@ from ..models.evaluator import FeedbackEvaluator
 from ..config.settings import DEFAULT_FRAMEWORK, DEFAULT_MODEL
 
 class FeedbackAnalyzer:
-    def __init__(self, model_key: str = DEFAULT_MODEL):
+    def __init__(
+        self,
+        model_key: str = DEFAULT_MODEL,
+        quantization: Optional[str] = None,
+        llm: Optional[LLMInterface] = None
+    ):
         """
         Initialize the feedback analyzer.
         
         Args:
             model_key: Key of the model configuration to use
+            quantization: Optional weight format overriding the configuration's
+            llm: LLM interface to analyze with; defaults to the shared
+                interface for model_key and quantization
         """
         self.data_loader = DataLoader()
-        self.llm = LLMInterface(model_key=model_key)
-        self.evaluator = FeedbackEvaluator()
+        self.llm = llm if llm is not None else LLMInterface.get(model_key, quantization)
+        self.evaluator = FeedbackEvaluator(llm=self.llm)
 
     def analyze_class_feedback(
         self,
@@ -40,19 +48,14 @@ class FeedbackAnalyzer:
         Returns:
             Dictionary containing class-level analysis
         """
-        # Load and preprocess data
-        dfs = self.data_loader.load_multiple_csvs(csv_files)
-        processed_data = {}
-        
-        for df in dfs.values():
-            processed = self.data_loader.preprocess_feedback_data(
-                df,
-                group_col,
-                student_col,
-                feedback_col,
-                date_col
-            )
-            processed_data.update(processed)
+        # Load and preprocess data (cached until the files change)
+        processed_data = self.data_loader.load_processed(
+            csv_files,
+            group_col,
+            student_col,
+            feedback_col,
+            date_col
+        )
         
         # Get basic statistics
         stats = self.data_loader.get_class_summary(processed_data)
@@ -89,19 +92,14 @@ class FeedbackAnalyzer:
         Returns:
             Dictionary containing group-level analysis
         """
-        # Load and preprocess data
-        dfs = self.data_loader.load_multiple_csvs(csv_files)
-        processed_data = {}
-        
-        for df in dfs.values():
-            processed = self.data_loader.preprocess_feedback_data(
-                df,
-                group_col,
-                student_col,
-                feedback_col,
-                date_col
-            )
-            processed_data.update(processed)
+        # Load and preprocess data (cached until the files change)
+        processed_data = self.data_loader.load_processed(
+            csv_files,
+            group_col,
+            student_col,
+            feedback_col,
+            date_col
+        )
         
         # Get basic statistics
         stats = self.data_loader.get_group_summary(processed_data, group_name)
@@ -145,26 +143,51 @@ class FeedbackAnalyzer:
         Returns:
             Dictionary containing student-level analysis
         """
-        # Load and preprocess data
-        dfs = self.data_loader.load_multiple_csvs(csv_files)
-        processed_data = {}
-        
-        for df in dfs.values():
-            processed = self.data_loader.preprocess_feedback_data(
-                df,
-                group_col,
-                student_col,
-                feedback_col,
-                date_col
-            )
-            processed_data.update(processed)
+        # Load and preprocess data (cached until the files change)
+        processed_data = self.data_loader.load_processed(
+            csv_files,
+            group_col,
+            student_col,
+            feedback_col,
+            date_col
+        )
+        
+        return self._analyze_student(
+            processed_data,
+            group_name,
+            student_name,
+            framework
+        )
+
+    def _analyze_student(
+        self,
+        processed_data: Dict[str, Any],
+        group_name: str,
+        student_name: str,
+        framework: str = DEFAULT_FRAMEWORK,
+        references: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyze one student's feedback from already processed data.
         
+        Args:
+            processed_data: Processed feedback data
+            group_name: Name of the group
+            student_name: Name of the student
+            framework: Analysis framework to use
+            references: Optional reference texts for BERTScore, one per feedback entry
+            
+        Returns:
+            Dictionary containing student-level analysis
+        """
         # Get student data
         student_data = self.data_loader.get_student_data(
             processed_data,
             group_name,
             student_name
         )
+        # Rejected before generating the analysis the evaluation would follow
+        self.evaluator.validate_references(student_data["feedback"], references)
         
         # Get LLM analysis
         llm_analysis = self.llm.analyze_student_level(
@@ -172,11 +195,11 @@ class FeedbackAnalyzer:
             framework
         )
         
-        # Evaluate feedback quality
-        evaluation_results = []
-        for feedback in student_data["feedback"]:
-            evaluation = self.evaluator.evaluate_feedback(feedback)
-            evaluation_results.append(evaluation)
+        # Evaluate feedback quality in one batched pass
+        evaluation_results = self.evaluator.evaluate_many(
+            student_data["feedback"],
+            references
+        )
         
         return {
             "student_data": student_data,
@@ -192,7 +215,8 @@ class FeedbackAnalyzer:
         student_name: str,
         group_col: str = "group",
         student_col: str = "student",
-        feedback_col: str = "feedback"
+        feedback_col: str = "feedback",
+        references: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """
         Compare feedback quality across different sources.
@@ -204,18 +228,23 @@ class FeedbackAnalyzer:
             group_col: Name of the group column
             student_col: Name of the student column
             feedback_col: Name of the feedback column
+            references: Optional reference texts for BERTScore, one per feedback entry
             
         Returns:
             Dictionary containing comparison results
         """
-        # Get student feedback
-        student_analysis = self.analyze_student_feedback(
+        # Load and preprocess data once, then analyze the student from it
+        processed_data = self.data_loader.load_processed(
             csv_files,
+            group_col,
+            student_col,
+            feedback_col
+        )
+        student_analysis = self._analyze_student(
+            processed_data,
             group_name,
             student_name,
-            group_col=group_col,
-            student_col=student_col,
-            feedback_col=feedback_col
+            references=references
         )
         
         # Compare evaluations
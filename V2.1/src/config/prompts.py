@@ -1,9 +1,86 @@
 """
 LLM prompt templates for different analysis levels and tasks.
 """
+import re
+from typing import List, Optional
+
+class PromptTemplate:
+    """
+    A prompt template pre-split on its named placeholders.
+    
+    The templates embed JSON examples whose literal braces str.format would
+    try to interpret, so only the listed placeholders are substituted, and
+    the template is parsed once instead of on every call.
+    """
+
+    def __init__(self, template: str, *fields: str):
+        """
+        Split the template around its placeholders.
+        
+        Args:
+            template: Template text containing {field} placeholders
+            *fields: Names of the placeholders to substitute
+        """
+        pattern = "|".join(re.escape("{" + field + "}") for field in fields)
+        parts = re.split(f"({pattern})", template)
+        # re.split keeps the captured placeholders at the odd positions
+        self.literals: List[str] = parts[0::2]
+        self.fields: List[str] = [part[1:-1] for part in parts[1::2]]
+
+    def __call__(self, **values: str) -> str:
+        """
+        Build a prompt by joining the literal parts with the given values.
+        
+        Args:
+            **values: Text for each placeholder
+            
+        Returns:
+            Complete prompt
+        """
+        pieces = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            pieces.append(values[field])
+            pieces.append(literal)
+        return "".join(pieces)
+
+    def match(self, prompt: str) -> Optional[List[str]]:
+        """
+        Recover the values a prompt was built with from this template.
+        
+        Args:
+            prompt: Complete prompt
+            
+        Returns:
+            Placeholder values in template order, or None if the prompt
+            was not built from this template
+        """
+        head, tail = self.literals[0], self.literals[-1]
+        if not self.fields:
+            return [] if prompt == head else None
+        end = len(prompt) - len(tail)
+        if not prompt.startswith(head) or not prompt.endswith(tail) or end < len(head):
+            return None
+        
+        values = []
+        position = len(head)
+        for literal in self.literals[1:-1]:
+            index = prompt.find(literal, position, end)
+            if index < 0:
+                return None
+            values.append(prompt[position:index])
+            position = index + len(literal)
+        values.append(prompt[position:end])
+        return values
+
+# Shared, byte-identical opening of every analysis prompt, so its key/value
+# cache can be computed once and reused across analysis levels
+ANALYSIS_SYSTEM_PREFIX = """
+You are an expert educational analyst. You analyze feedback that students in project groups gave \
+and received, and you answer with a single JSON object in exactly the requested format.
+"""
 
-CLASS_LEVEL_PROMPT = """
-You are an expert educational analyst. Analyze the following feedback data from multiple student groups:
+CLASS_LEVEL_PROMPT = ANALYSIS_SYSTEM_PREFIX + """
+Analyze the following feedback data from multiple student groups:
 
 {feedback_data}
 
@@ -26,7 +103,7 @@ Format your response as a structured JSON with the following sections:
 }
 """
 
-GROUP_LEVEL_PROMPT = """
+GROUP_LEVEL_PROMPT = ANALYSIS_SYSTEM_PREFIX + """
 Analyze the following feedback data for a specific group:
 
 {group_data}
@@ -48,7 +125,7 @@ Format your response as a structured JSON with the following sections:
 }
 """
 
-STUDENT_LEVEL_PROMPT = """
+STUDENT_LEVEL_PROMPT = ANALYSIS_SYSTEM_PREFIX + """
 Analyze the following feedback for a specific student:
 
 {student_data}
@@ -70,6 +147,57 @@ Format your response as a structured JSON with the following sections:
 }
 """
 
+COMBINED_ANALYSIS_PROMPT = ANALYSIS_SYSTEM_PREFIX + """
+Analyze feedback at three levels in one response.
+
+Class-level feedback data from multiple student groups:
+
+{feedback_data}
+
+Feedback data for a specific group:
+
+{group_data}
+
+Feedback for a specific student:
+
+{student_data}
+
+For the class, address overall trends and patterns, group performance comparisons, topic-wise
+strengths and weaknesses, self-assessment vs peer-assessment alignment, groups requiring immediate
+attention and groups that need more challenging tasks.
+For the group, address group dynamics and collaboration, individual contributions, topic mastery
+levels, areas of improvement and notable achievements.
+For the student, evaluate the feedback using the {framework} framework and give a structured
+analysis, key strengths, areas for improvement, development recommendations and notable patterns
+or concerns.
+
+Format your response as a structured JSON with the following sections:
+{
+    "class_level": {
+        "overall_trends": {},
+        "group_comparisons": {},
+        "topic_analysis": {},
+        "assessment_alignment": {},
+        "attention_needed": {},
+        "challenge_needed": {}
+    },
+    "group_level": {
+        "group_dynamics": {},
+        "contributions": {},
+        "topic_mastery": {},
+        "improvement_areas": {},
+        "achievements": {}
+    },
+    "student_level": {
+        "framework_analysis": {},
+        "strengths": [],
+        "improvement_areas": [],
+        "recommendations": [],
+        "patterns": {}
+    }
+}
+"""
+
 EVALUATION_PROMPT = """
 As an expert educational evaluator, assess the quality of the following feedback:
 
@@ -95,4 +223,25 @@ Format your response as:
         "evidence": number
     }
 }
-""" 
\ No newline at end of file
+"""
+
+class_level_prompt = PromptTemplate(CLASS_LEVEL_PROMPT, "feedback_data")
+group_level_prompt = PromptTemplate(GROUP_LEVEL_PROMPT, "group_data")
+student_level_prompt = PromptTemplate(STUDENT_LEVEL_PROMPT, "student_data", "framework")
+combined_analysis_prompt = PromptTemplate(
+    COMBINED_ANALYSIS_PROMPT,
+    "feedback_data",
+    "group_data",
+    "student_data",
+    "framework"
+)
+evaluation_prompt = PromptTemplate(EVALUATION_PROMPT, "feedback_text")
+
+# Every template above, for code that needs to recognize prompts built from them
+PROMPT_TEMPLATES = [
+    class_level_prompt,
+    group_level_prompt,
+    student_level_prompt,
+    combined_analysis_prompt,
+    evaluation_prompt
+]
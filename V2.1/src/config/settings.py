@@ -2,6 +2,7 @@
 System-wide settings and configurations.
 """
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -24,6 +25,87 @@ MODEL_NAME = os.getenv("MODEL_NAME", "meta-llama/Llama-2-70b-chat-hf")
 MAX_TOKENS = 2000
 TEMPERATURE = 0.7
 
+# Model Configurations
+MODEL_CONFIGS = {
+    "llama-3.1-8b": {
+        "name": "meta-llama/Llama-3.1-8B-Instruct",
+        "max_tokens": 512,
+        "temperature": 0.7,
+        "context_length": 4096,
+        "quantization": "bf16",  # "bf16", "fp16", "int8" or "nf4" (4-bit bitsandbytes)
+        "backend": "hf",  # "hf" (local transformers), "vllm" or "ollama"
+        "draft_model": "llama-3.2-1b"  # Draft model used when LLM_SPECULATIVE=1
+    },
+    "llama-3.2-1b": {
+        "name": "meta-llama/Llama-3.2-1B-Instruct",
+        "max_tokens": 512,
+        "temperature": 0.7,
+        "context_length": 4096,
+        "quantization": "bf16",
+        "backend": "hf"
+    },
+    "llama-3.1-8b-vllm": {
+        "name": "meta-llama/Llama-3.1-8B-Instruct",
+        "max_tokens": 512,
+        "temperature": 0.7,
+        "context_length": 4096,
+        "backend": "vllm",
+        "base_url": os.getenv("VLLM_BASE_URL", "http://localhost:8000/v1")
+    },
+    "llama-3.1-8b-ollama": {
+        "name": "llama3.1:8b",
+        "max_tokens": 512,
+        "temperature": 0.7,
+        "context_length": 4096,
+        "backend": "ollama",
+        "base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
+    },
+    "llama-3.2-1b-vllm": {
+        "name": "meta-llama/Llama-3.2-1B-Instruct",
+        "max_tokens": 512,
+        "temperature": 0.7,
+        "context_length": 4096,
+        "backend": "vllm",
+        "base_url": os.getenv("VLLM_BASE_URL", "http://localhost:8000/v1")
+    },
+    "llama-3.2-1b-ollama": {
+        "name": "llama3.2:1b",
+        "max_tokens": 512,
+        "temperature": 0.7,
+        "context_length": 4096,
+        "backend": "ollama",
+        "base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
+    }
+}
+DEFAULT_MODEL = "llama-3.1-8b"
+EVAL_MAX_TOKENS = 256  # Token budget for the JSON responses of feedback evaluations
+LLM_TORCH_COMPILE = os.getenv("LLM_TORCH_COMPILE", "0") == "1"  # Compile local model forward passes
+LLM_GUIDED_JSON = os.getenv("LLM_GUIDED_JSON", "1") == "1"  # Schema-constrained decoding when outlines is installed
+LLM_SPECULATIVE = os.getenv("LLM_SPECULATIVE", "0") == "1"  # Decode single prompts with the config's draft_model
+LLM_ATTN_IMPLEMENTATION = os.getenv("LLM_ATTN_IMPLEMENTATION")  # e.g. "eager"; unset picks flash_attention_2 or sdpa
+
+# Remote Backend Configuration (vLLM / Ollama)
+REMOTE_MAX_CONNECTIONS = 64  # Pooled connections to the inference server
+REMOTE_TIMEOUT = 300  # Seconds before a remote generation request fails
+
+# Inference Batching Configuration
+BATCH_MAX_SIZE = 64  # Maximum number of prompts per batched generate call
+BATCH_MAX_WAIT_MS = 20  # Time to wait for more requests before flushing a batch
+BATCH_LENGTH_BUCKETS = [64, 256, 1024]  # Prompt token lengths separating batches of similar length
+
+# Response Cache Configuration
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_SIZE = 1024  # Responses kept in memory
+LLM_CACHE_TTL = 24 * 60 * 60  # Lifetime of shared (Redis) entries in seconds
+LLM_CACHE_REDIS_URL = os.getenv("LLM_CACHE_REDIS_URL")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR")  # Optional on-disk tier that persists across runs
+# Semantic matching is off unless a cosine similarity threshold (e.g. 0.92) is set
+LLM_CACHE_SIMILARITY_THRESHOLD = (
+    float(os.getenv("LLM_CACHE_SIMILARITY_THRESHOLD"))
+    if os.getenv("LLM_CACHE_SIMILARITY_THRESHOLD")
+    else None
+)
+
 # Analysis Configuration
 DEFAULT_FRAMEWORK = "ICAP"  # Can be changed to other frameworks
 SENTIMENT_THRESHOLD = 0.5
@@ -36,9 +118,18 @@ EVALUATION_METRICS = [
     "shap",
     "llm_evaluation"
 ]
+SHAP_MAX_EVALS = 300  # Model evaluations per explained text for Partition SHAP
+EXPLAINER_MAX_WORKERS = 4  # Threads running LIME/SHAP explanations concurrently
 
 # Data Processing Configuration
 CSV_ENCODING = "utf-8"
+CSV_CHUNK_SIZE = 100_000  # Rows per chunk when streaming large CSV files
+CSV_BLOCK_SIZE = 64 << 20  # Bytes per record batch for the pyarrow streaming reader
+CSV_MAX_WORKERS = 8  # Threads used to read several CSV files at once
+# Combined size of several CSV files above which they are preprocessed in
+# spawned worker processes; starting the workers costs a few seconds
+CSV_PROCESS_MIN_BYTES = 256 << 20
+PROCESSED_CACHE_SIZE = 32  # Preprocessed file sets kept in memory
 DATE_FORMAT = "%Y-%m-%d"
 
 # Visualization Configuration
@@ -50,9 +141,14 @@ COLOR_SCHEME = {
     "highlight": "#3498db"
 }
 
+# Template Configuration
+TEMPLATE_CACHE_DIR = Path(os.getenv("TEMPLATE_CACHE_DIR", Path(tempfile.gettempdir()) / "tp_jinja_cache"))
+TEMPLATE_CACHE_SIZE = 1000  # Number of compiled templates kept in memory
+
 # API Configuration
 API_VERSION = "v1"
 API_PREFIX = f"/api/{API_VERSION}"
+UPLOAD_CHUNK_SIZE = 1 << 20  # Bytes read per chunk when saving uploaded files
 HOST = "0.0.0.0"
 PORT = 8000
 DEBUG = True 
\ No newline at end of file
@@ -1,10 +1,202 @@
 """
 Data loading and preprocessing module.
 """
+import json
+import multiprocessing
+import os
+import numpy as np
 import pandas as pd
+from collections import defaultdict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-from ..config.settings import RAW_DATA_DIR, CSV_ENCODING
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
+from ..config.settings import (
+    RAW_DATA_DIR,
+    CSV_ENCODING,
+    CSV_CHUNK_SIZE,
+    CSV_BLOCK_SIZE,
+    CSV_MAX_WORKERS,
+    CSV_PROCESS_MIN_BYTES,
+    PROCESSED_CACHE_SIZE
+)
+
+def _json_default(value: Any) -> Any:
+    """Encode what json cannot: mappings as plain dicts, anything else (dates) as text."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+def serialize_feedback(data: Any) -> str:
+    """
+    Serialize feedback data as compact JSON for a prompt.
+    
+    Indentation only adds prompt tokens, so none is used. Stores that cache
+    their own serialization (ProcessedFeedback) are asked for it directly.
+    Dates, which the pyarrow CSV engine parses into date objects, are
+    written as text.
+    
+    Args:
+        data: Feedback data to serialize
+        
+    Returns:
+        JSON string
+    """
+    if hasattr(data, "to_json"):
+        return data.to_json()
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+
+class ProcessedFeedback(Mapping):
+    """
+    Column-oriented store of per-student feedback.
+    
+    One row per (group, student) pair is kept in parallel arrays, so summaries
+    are vectorized reductions. Indexing by group name still returns the nested
+    ``{student: {"feedback": [...], "feedback_count": int, "dates": [...]}}``
+    dicts the rest of the code expects; those are built on access.
+    """
+
+    def __init__(
+        self,
+        groups: List[Any],
+        students: List[Any],
+        feedback_lists: List[List[Any]],
+        date_lists: Optional[List[List[Any]]] = None
+    ):
+        """
+        Initialize the store from parallel per-student columns.
+        
+        Args:
+            groups: Group of each row
+            students: Student of each row
+            feedback_lists: Feedback entries of each row
+            date_lists: Optional dates of each row's feedback entries
+        """
+        self.groups = np.array(groups, dtype=object)
+        self.students = np.array(students, dtype=object)
+        self.feedback_lists = list(feedback_lists)
+        self.date_lists = None if date_lists is None else list(date_lists)
+        self.feedback_counts = np.fromiter(
+            (len(feedback) for feedback in self.feedback_lists),
+            dtype=np.int32,
+            count=len(self.feedback_lists)
+        )
+        self.index: Dict[Tuple[Any, Any], int] = {}
+        self._group_rows: Dict[Any, List[int]] = {}
+        for i, key in enumerate(zip(groups, students)):
+            self.index[key] = i
+            self._group_rows.setdefault(key[0], []).append(i)
+        self._json: Optional[str] = None
+
+    @classmethod
+    def merge(cls, parts: Iterable["ProcessedFeedback"]) -> "ProcessedFeedback":
+        """
+        Combine several stores, concatenating feedback of students present in more than one.
+        
+        Args:
+            parts: Stores to combine
+            
+        Returns:
+            Combined store
+        """
+        parts = list(parts)
+        if len(parts) == 1:
+            return parts[0]
+        
+        with_dates = bool(parts) and all(part.date_lists is not None for part in parts)
+        rows: Dict[Tuple[Any, Any], Tuple[List[Any], List[Any]]] = {}
+        for part in parts:
+            for key, i in part.index.items():
+                feedback, dates = rows.setdefault(key, ([], []))
+                feedback.extend(part.feedback_lists[i])
+                if with_dates:
+                    dates.extend(part.date_lists[i])
+        
+        return cls.from_rows(rows, with_dates)
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Dict[Tuple[Any, Any], Tuple[List[Any], List[Any]]],
+        with_dates: bool
+    ) -> "ProcessedFeedback":
+        """
+        Build a store from accumulated per-student rows.
+        
+        Args:
+            rows: Mapping of (group, student) to (feedback entries, dates)
+            with_dates: Whether the dates lists are populated
+            
+        Returns:
+            Store with one row per (group, student) pair
+        """
+        return cls(
+            [group for group, _ in rows],
+            [student for _, student in rows],
+            [feedback for feedback, _ in rows.values()],
+            [dates for _, dates in rows.values()] if with_dates else None
+        )
+
+    def student_record(self, i: int) -> Dict[str, Any]:
+        """
+        Build the per-student dict for a row.
+        
+        Args:
+            i: Row index
+            
+        Returns:
+            Dictionary containing the student's feedback, count and dates
+        """
+        record = {
+            "feedback": list(self.feedback_lists[i]),
+            "feedback_count": int(self.feedback_counts[i])
+        }
+        if self.date_lists is not None:
+            record["dates"] = list(self.date_lists[i])
+        return record
+
+    def group_rows(self, group: Any) -> List[int]:
+        """Row indices belonging to a group."""
+        return self._group_rows[group]
+
+    def to_dict(self) -> Dict[Any, Dict[Any, Dict[str, Any]]]:
+        """Materialize the nested dict representation."""
+        return {group: self[group] for group in self}
+
+    def to_json(self) -> str:
+        """
+        Serialize the nested dict representation as compact JSON.
+        
+        The store is never modified after construction, so the string is
+        built once and reused by every later call.
+        
+        Returns:
+            JSON string without indentation or padding whitespace
+        """
+        if self._json is None:
+            self._json = json.dumps(
+                self.to_dict(),
+                separators=(",", ":"),
+                ensure_ascii=False,
+                default=str
+            )
+        return self._json
+
+    def __getitem__(self, group: Any) -> Dict[Any, Dict[str, Any]]:
+        return {
+            self.students[i]: self.student_record(i)
+            for i in self._group_rows[group]
+        }
+
+    def __contains__(self, group: Any) -> bool:
+        return group in self._group_rows
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._group_rows)
+
+    def __len__(self) -> int:
+        return len(self._group_rows)
 
 class DataLoader:
     def __init__(self):
@@ -22,7 +214,58 @@ class DataLoader:
             DataFrame containing the CSV data
         """
         file_path = self.raw_data_dir / filename
-        return pd.read_csv(file_path, encoding=CSV_ENCODING)
+        try:
+            # The multithreaded pyarrow parser is much faster on wide files
+            return pd.read_csv(file_path, encoding=CSV_ENCODING, engine="pyarrow")
+        except (ImportError, ValueError):
+            # pyarrow is not installed or cannot handle this file
+            return pd.read_csv(
+                file_path,
+                encoding=CSV_ENCODING,
+                engine="c",
+                low_memory=False,
+                cache_dates=True,
+                memory_map=True
+            )
+
+    def load_csv_chunks(
+        self,
+        filename: str,
+        chunksize: int = CSV_CHUNK_SIZE,
+        block_size: int = CSV_BLOCK_SIZE
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Load a CSV file lazily as an iterator of DataFrame chunks.
+        
+        The pyarrow streaming reader is used when available, yielding one chunk
+        per record batch of about block_size bytes; otherwise pandas yields
+        chunks of chunksize rows.
+        
+        Args:
+            filename: Name of the CSV file
+            chunksize: Number of rows per chunk for the pandas fallback
+            block_size: Bytes per record batch for the pyarrow reader
+            
+        Returns:
+            Iterator yielding DataFrames
+        """
+        file_path = self.raw_data_dir / filename
+        try:
+            from pyarrow import csv as pa_csv
+        except ImportError:
+            return pd.read_csv(
+                file_path,
+                encoding=CSV_ENCODING,
+                engine="c",
+                chunksize=chunksize,
+                memory_map=True
+            )
+        
+        reader = pa_csv.open_csv(
+            file_path,
+            read_options=pa_csv.ReadOptions(encoding=CSV_ENCODING, block_size=block_size)
+        )
+        return (batch.to_pandas() for batch in reader)
 
     def load_multiple_csvs(self, filenames: List[str]) -> Dict[str, pd.DataFrame]:
         """
@@ -34,14 +277,17 @@ class DataLoader:
         Returns:
             Dictionary mapping filenames to DataFrames
         """
-        return {
-            filename: self.load_csv(filename)
-            for filename in filenames
-        }
+        if len(filenames) <= 1:
+            return {filename: self.load_csv(filename) for filename in filenames}
+        
+        # pandas releases the GIL while parsing, so reads overlap across threads
+        with ThreadPoolExecutor(max_workers=min(CSV_MAX_WORKERS, len(filenames))) as executor:
+            dfs = list(executor.map(self.load_csv, filenames))
+        return dict(zip(filenames, dfs))
 
     def preprocess_feedback_data(
         self,
-        df: pd.DataFrame,
+        df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
         group_col: str = "group",
         student_col: str = "student",
         feedback_col: str = "feedback",
@@ -51,41 +297,79 @@ class DataLoader:
         Preprocess feedback data into a structured format.
         
         Args:
-            df: Input DataFrame
+            df: Input DataFrame, or an iterator of chunks of one
             group_col: Name of the group column
             student_col: Name of the student column
             feedback_col: Name of the feedback column
             date_col: Optional name of the date column
             
         Returns:
-            Structured dictionary of feedback data
+            Structured feedback data, indexable as {group: {student: {...}}}
         """
-        # Group by group and student
-        grouped_data = df.groupby([group_col, student_col])[feedback_col].agg(list).reset_index()
+        chunks = [df] if isinstance(df, pd.DataFrame) else df
         
-        # Create nested structure
-        processed_data = {}
-        for _, row in grouped_data.iterrows():
-            group = row[group_col]
-            student = row[student_col]
-            feedback = row[feedback_col]
-            
-            if group not in processed_data:
-                processed_data[group] = {}
-            
-            processed_data[group][student] = {
-                "feedback": feedback,
-                "feedback_count": len(feedback)
-            }
+        # Build the per-student lists in a single pass over the columns,
+        # one chunk at a time so only the current chunk is held in memory
+        rows = defaultdict(lambda: ([], []))
+        for chunk in chunks:
+            # Rows with a missing group or student cannot be attributed to anyone
+            keyed = chunk[group_col].notna() & chunk[student_col].notna()
+            if not keyed.all():
+                chunk = chunk[keyed]
             
+            groups = chunk[group_col].tolist()
+            students = chunk[student_col].tolist()
+            feedback = chunk[feedback_col].tolist()
             if date_col:
-                dates = df[
-                    (df[group_col] == group) & 
-                    (df[student_col] == student)
-                ][date_col].tolist()
-                processed_data[group][student]["dates"] = dates
+                for group, student, text, date in zip(groups, students, feedback, chunk[date_col].tolist()):
+                    entry = rows[(group, student)]
+                    entry[0].append(text)
+                    entry[1].append(date)
+            else:
+                for group, student, text in zip(groups, students, feedback):
+                    rows[(group, student)][0].append(text)
         
-        return processed_data
+        return ProcessedFeedback.from_rows(rows, with_dates=bool(date_col))
+
+    def load_processed(
+        self,
+        filenames: List[str],
+        group_col: str = "group",
+        student_col: str = "student",
+        feedback_col: str = "feedback",
+        date_col: Optional[str] = None,
+        chunk_size: Optional[int] = None
+    ) -> ProcessedFeedback:
+        """
+        Load and preprocess CSV files, reusing earlier results for unchanged files.
+        
+        Args:
+            filenames: List of CSV filenames
+            group_col: Name of the group column
+            student_col: Name of the student column
+            feedback_col: Name of the feedback column
+            date_col: Optional name of the date column
+            chunk_size: If given, stream each file in chunks instead of loading
+                it whole, bounding peak memory on large files; rows per chunk
+                when pyarrow is unavailable
+            
+        Returns:
+            Structured feedback data for all files combined; shared between
+            callers, so it must not be modified
+        """
+        # Modification times in the key invalidate entries when a file changes
+        files_key = tuple(
+            (str(path), os.path.getmtime(path))
+            for path in (self.raw_data_dir / filename for filename in filenames)
+        )
+        return _load_and_preprocess(
+            files_key,
+            group_col,
+            student_col,
+            feedback_col,
+            date_col,
+            chunk_size
+        )
 
     def get_class_summary(self, processed_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -97,13 +381,18 @@ class DataLoader:
         Returns:
             Dictionary containing class-level statistics
         """
-        total_groups = len(processed_data)
-        total_students = sum(len(group_data) for group_data in processed_data.values())
-        total_feedback = sum(
-            student_data["feedback_count"]
-            for group_data in processed_data.values()
-            for student_data in group_data.values()
-        )
+        if isinstance(processed_data, ProcessedFeedback):
+            total_groups = len(processed_data)
+            total_students = len(processed_data.students)
+            total_feedback = int(processed_data.feedback_counts.sum())
+        else:
+            total_groups = len(processed_data)
+            total_students = sum(len(group_data) for group_data in processed_data.values())
+            total_feedback = sum(
+                student_data["feedback_count"]
+                for group_data in processed_data.values()
+                for student_data in group_data.values()
+            )
         
         return {
             "total_groups": total_groups,
@@ -129,13 +418,18 @@ class DataLoader:
         """
         if group_name not in processed_data:
             raise ValueError(f"Group {group_name} not found in data")
-            
-        group_data = processed_data[group_name]
-        total_students = len(group_data)
-        total_feedback = sum(
-            student_data["feedback_count"]
-            for student_data in group_data.values()
-        )
+        
+        if isinstance(processed_data, ProcessedFeedback):
+            rows = processed_data.group_rows(group_name)
+            total_students = len(rows)
+            total_feedback = int(processed_data.feedback_counts[rows].sum())
+        else:
+            group_data = processed_data[group_name]
+            total_students = len(group_data)
+            total_feedback = sum(
+                student_data["feedback_count"]
+                for student_data in group_data.values()
+            )
         
         return {
             "total_students": total_students,
@@ -162,8 +456,74 @@ class DataLoader:
         """
         if group_name not in processed_data:
             raise ValueError(f"Group {group_name} not found in data")
+        
+        if isinstance(processed_data, ProcessedFeedback):
+            i = processed_data.index.get((group_name, student_name))
+            if i is None:
+                raise ValueError(f"Student {student_name} not found in group {group_name}")
+            return processed_data.student_record(i)
             
         if student_name not in processed_data[group_name]:
             raise ValueError(f"Student {student_name} not found in group {group_name}")
             
-        return processed_data[group_name][student_name] 
\ No newline at end of file
+        return processed_data[group_name][student_name]
+
+@lru_cache(maxsize=PROCESSED_CACHE_SIZE)
+def _load_and_preprocess(
+    files_key: Tuple[Tuple[str, float], ...],
+    group_col: str,
+    student_col: str,
+    feedback_col: str,
+    date_col: Optional[str],
+    chunk_size: Optional[int] = None
+) -> ProcessedFeedback:
+    """Cached body of DataLoader.load_processed, keyed on (path, mtime) pairs."""
+    tasks = [
+        (path, group_col, student_col, feedback_col, date_col, chunk_size)
+        for path, _ in files_key
+    ]
+    if len(tasks) <= 1:
+        return ProcessedFeedback.merge(map(_preprocess_file, tasks))
+    
+    total_bytes = sum(os.path.getsize(path) for path, _ in files_key)
+    cpus = os.cpu_count() or 1
+    if total_bytes < CSV_PROCESS_MIN_BYTES or cpus == 1:
+        # Parsing releases the GIL, so threads still overlap most of the work
+        with ThreadPoolExecutor(max_workers=min(CSV_MAX_WORKERS, len(tasks))) as executor:
+            return ProcessedFeedback.merge(executor.map(_preprocess_file, tasks))
+    
+    # The per-student accumulation holds the GIL, so large inputs go to
+    # separate processes. They are spawned rather than forked: the API
+    # process runs CUDA and several threads, which a forked child inherits
+    # in an undefined state
+    with ProcessPoolExecutor(
+        max_workers=min(cpus, len(tasks)),
+        mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        return ProcessedFeedback.merge(executor.map(_preprocess_file, tasks))
+
+def _preprocess_file(
+    task: Tuple[str, str, str, str, Optional[str], Optional[int]]
+) -> ProcessedFeedback:
+    """
+    Load and preprocess one CSV file; runs in a worker process.
+    
+    Args:
+        task: Tuple of (path, group_col, student_col, feedback_col, date_col, chunk_size)
+        
+    Returns:
+        Structured feedback data for the file
+    """
+    path, group_col, student_col, feedback_col, date_col, chunk_size = task
+    data_loader = DataLoader()
+    if chunk_size:
+        source = data_loader.load_csv_chunks(path, chunksize=chunk_size)
+    else:
+        source = data_loader.load_csv(path)
+    return data_loader.preprocess_feedback_data(
+        source,
+        group_col,
+        student_col,
+        feedback_col,
+        date_col
+    )
@@ -0,0 +1,141 @@
+"""
+Remote inference backends served over an OpenAI-compatible HTTP API.
+"""
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+import httpx
+from ..config.settings import REMOTE_MAX_CONNECTIONS, REMOTE_TIMEOUT
+
+class RemoteBackend:
+    def __init__(
+        self,
+        model_name: str,
+        base_url: str,
+        max_connections: int = REMOTE_MAX_CONNECTIONS,
+        timeout: float = REMOTE_TIMEOUT,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Initialize a client for a vLLM or Ollama server.
+
+        Requests go through one pooled httpx.AsyncClient that lives on a
+        dedicated event loop thread, so blocking callers and concurrent
+        batches all reuse the same keep-alive connections. The server batches
+        concurrent requests itself (continuous batching).
+
+        Args:
+            model_name: Model name as known to the server
+            base_url: Base URL of the OpenAI-compatible API, e.g. http://localhost:8000/v1
+            max_connections: Maximum number of concurrent connections to the server
+            timeout: Request timeout in seconds
+            transport: Optional httpx transport in place of the network, e.g. for tests
+        """
+        self.model_name = model_name
+        self.base_url = base_url.rstrip("/")
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            )
+        )
+
+    async def agenerate(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        json_schema: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Generate a response for one prompt.
+
+        Args:
+            prompt: The input prompt
+            max_tokens: Maximum number of tokens to generate
+            temperature: Sampling temperature
+            json_schema: Optional JSON schema the server constrains the response to
+
+        Returns:
+            Generated response as string
+        """
+        payload: Dict[str, Any] = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if json_schema is not None:
+            # Both vLLM and Ollama accept the OpenAI structured output format
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": json_schema.get("title", "response"),
+                    "schema": json_schema
+                }
+            }
+        response = await self._client.post("/chat/completions", json=payload)
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def agenerate_batch(
+        self,
+        prompts: List[str],
+        max_tokens: int,
+        temperature: float,
+        json_schema: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """
+        Send all prompts concurrently and wait for every response.
+
+        Args:
+            prompts: The input prompts
+            max_tokens: Maximum number of tokens to generate
+            temperature: Sampling temperature
+            json_schema: Optional JSON schema the server constrains the responses to
+
+        Returns:
+            Generated responses, in the same order as the prompts
+        """
+        return list(await asyncio.gather(*(
+            self.agenerate(prompt, max_tokens, temperature, json_schema)
+            for prompt in prompts
+        )))
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        max_tokens: int,
+        temperature: float,
+        json_schema: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """
+        Blocking wrapper around agenerate_batch for synchronous callers.
+
+        Args:
+            prompts: The input prompts
+            max_tokens: Maximum number of tokens to generate
+            temperature: Sampling temperature
+            json_schema: Optional JSON schema the server constrains the responses to
+
+        Returns:
+            Generated responses, in the same order as the prompts
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self.agenerate_batch(prompts, max_tokens, temperature, json_schema),
+            self._loop
+        ).result()
+
+    def close(self) -> None:
+        """Close the connection pool and stop the event loop thread."""
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
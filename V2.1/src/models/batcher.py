@@ -0,0 +1,161 @@
+"""
+Dynamic batching of concurrent LLM requests.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..config.settings import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+
+class RequestBatcher:
+    def __init__(
+        self,
+        generate_batch: Callable[..., List[str]],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS
+    ):
+        """
+        Initialize the request batcher.
+
+        Args:
+            generate_batch: Blocking callable that generates responses for a list of prompts
+            max_batch_size: Maximum number of prompts sent to one generate_batch call
+            max_wait_ms: How long to wait for more requests once the first one arrives
+        """
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # generate_batch runs on a thread of its own. Callers blocked in
+        # submit_threadsafe usually occupy the loop's default executor (they
+        # come from asyncio.to_thread), so sharing it could starve the batch
+        # they are waiting for
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the background worker is accepting requests."""
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self) -> None:
+        """Start the background worker on the running event loop."""
+        if self.is_running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="request-batcher")
+        self._worker = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background worker and fail any requests still queued."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        # A generate call still running finishes in the background
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Request batcher stopped"))
+
+    async def submit(self, prompt: str, **generate_kwargs: Any) -> str:
+        """
+        Queue a prompt and wait for its response.
+
+        Args:
+            prompt: The input prompt
+            **generate_kwargs: Generation settings passed to generate_batch
+
+        Returns:
+            Generated response as string
+        """
+        if not self.is_running:
+            raise RuntimeError("Request batcher is not running")
+        future = self._loop.create_future()
+        await self._queue.put((prompt, generate_kwargs, future))
+        return await future
+
+    def submit_threadsafe(self, prompt: str, **generate_kwargs: Any) -> str:
+        """
+        Queue a prompt from a worker thread and block until its response is ready.
+
+        Args:
+            prompt: The input prompt
+            **generate_kwargs: Generation settings passed to generate_batch
+
+        Returns:
+            Generated response as string
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            raise RuntimeError("submit_threadsafe would block the batcher's own event loop")
+
+        return asyncio.run_coroutine_threadsafe(
+            self.submit(prompt, **generate_kwargs),
+            self._loop
+        ).result()
+
+    async def _collect(self, items: List[Tuple[str, Dict[str, Any], asyncio.Future]]) -> None:
+        """Wait for one request, then gather more into items until the batch is full or the wait expires."""
+        items.append(await self._queue.get())
+        deadline = self._loop.time() + self.max_wait
+
+        while len(items) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self) -> None:
+        """Drain the queue into batched generate calls and fan results back out."""
+        while True:
+            items: List[Tuple[str, Dict[str, Any], asyncio.Future]] = []
+            try:
+                await self._collect(items)
+                await self._dispatch(items)
+            except asyncio.CancelledError:
+                # Requests already taken off the queue are not drained by stop
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Request batcher stopped"))
+                raise
+
+    async def _dispatch(self, items: List[Tuple[str, Dict[str, Any], asyncio.Future]]) -> None:
+        """Send collected requests to generate_batch, one call per set of generation settings."""
+        # Requests with different generation settings cannot share a generate call
+        batches: Dict[Tuple, List[Tuple[str, asyncio.Future]]] = {}
+        for prompt, generate_kwargs, future in items:
+            key = tuple(sorted(generate_kwargs.items()))
+            batches.setdefault(key, []).append((prompt, future))
+
+        for key, batch in batches.items():
+            prompts = [prompt for prompt, _ in batch]
+            try:
+                responses = await self._loop.run_in_executor(
+                    self._executor,
+                    functools.partial(self.generate_batch, prompts, **dict(key))
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
@@ -0,0 +1,203 @@
+"""
+Response cache for LLM generations.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from ..config.prompts import PROMPT_TEMPLATES
+from ..config.settings import (
+    LLM_CACHE_SIZE,
+    LLM_CACHE_TTL,
+    LLM_CACHE_REDIS_URL,
+    LLM_CACHE_DIR,
+    LLM_CACHE_SIMILARITY_THRESHOLD
+)
+
+class LLMCache:
+    def __init__(
+        self,
+        max_size: int = LLM_CACHE_SIZE,
+        redis_url: Optional[str] = LLM_CACHE_REDIS_URL,
+        ttl: int = LLM_CACHE_TTL,
+        similarity_threshold: Optional[float] = LLM_CACHE_SIMILARITY_THRESHOLD,
+        cache_dir: Optional[str] = LLM_CACHE_DIR
+    ):
+        """
+        Initialize the cache.
+
+        Exact matches are served from an in-process LRU, backed by an on-disk
+        diskcache directory and/or Redis when configured, so entries survive
+        restarts (and, with Redis, are shared between machines). When a
+        similarity threshold is set, prompts whose embedding is at least that
+        close to an earlier prompt with the same generation settings reuse
+        its response. Prompts built from one of the prompt templates are only
+        compared with prompts from the same template, by the values filled
+        into it, as the shared template text would make them all look alike.
+
+        Args:
+            max_size: Number of responses kept in memory
+            redis_url: Optional Redis URL for a shared second tier
+            ttl: Lifetime of Redis and on-disk entries in seconds
+            similarity_threshold: Optional cosine similarity for semantic hits
+            cache_dir: Optional directory for a persistent on-disk tier
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._disk = None
+        if cache_dir:
+            import diskcache
+            self._disk = diskcache.Cache(cache_dir)
+
+        self._redis = None
+        if redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(redis_url)
+
+        self._encoder = None
+        self._embeddings: Dict[str, Tuple[List[np.ndarray], List[str]]] = {}
+
+    @staticmethod
+    def cache_key(prompt: str, **params: Any) -> str:
+        """
+        Build the exact-match key for a prompt and its generation settings.
+
+        Args:
+            prompt: The input prompt
+            **params: Generation settings that affect the response
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        payload = json.dumps({"prompt": prompt, **params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, prompt: str, **params: Any) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            prompt: The input prompt
+            **params: Generation settings that affect the response
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        key = self.cache_key(prompt, **params)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if self._disk is not None:
+            response = self._disk.get(key)
+            if response is not None:
+                self._remember(key, response)
+                return response
+
+        if self._redis is not None:
+            response = self._redis_get(key)
+            if response is not None:
+                self._remember(key, response)
+                return response
+
+        if self.similarity_threshold is not None:
+            return self._semantic_get(prompt, params)
+        return None
+
+    def set(self, prompt: str, response: str, **params: Any) -> None:
+        """
+        Store a response.
+
+        Args:
+            prompt: The input prompt
+            response: Generated response
+            **params: Generation settings that affect the response
+        """
+        key = self.cache_key(prompt, **params)
+        self._remember(key, response)
+
+        if self._disk is not None:
+            self._disk.set(key, response, expire=self.ttl)
+
+        if self._redis is not None:
+            self._redis_set(key, response)
+
+        if self.similarity_threshold is not None:
+            self._semantic_set(prompt, response, params)
+
+    def _remember(self, key: str, response: str) -> None:
+        """Insert into the in-process LRU, evicting the oldest entry when full."""
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _redis_get(self, key: str) -> Optional[str]:
+        """Read from Redis, treating connection problems as a miss."""
+        import redis
+        try:
+            value = self._redis.get(key)
+        except redis.RedisError:
+            return None
+        return None if value is None else value.decode("utf-8")
+
+    def _redis_set(self, key: str, response: str) -> None:
+        """Write to Redis, ignoring connection problems."""
+        import redis
+        try:
+            self._redis.set(key, response, ex=self.ttl)
+        except redis.RedisError:
+            pass
+
+    def _embed(self, text: str) -> np.ndarray:
+        """Embed text with a small sentence-transformers model, loaded on first use."""
+        if self._encoder is None:
+            from sentence_transformers import SentenceTransformer
+            self._encoder = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        return self._encoder.encode(text, normalize_embeddings=True)
+
+    def _semantic_text(self, prompt: str, params: dict) -> Tuple[str, str]:
+        """Get the text of a prompt to embed and the scope it is compared within."""
+        for template in PROMPT_TEMPLATES:
+            values = template.match(prompt)
+            if values is not None:
+                return "\n".join(values), self.cache_key(template.literals[0], **params)
+        return prompt, self.cache_key("", **params)
+
+    def _semantic_get(self, prompt: str, params: dict) -> Optional[str]:
+        """Return the response of the most similar earlier prompt above the threshold."""
+        text, scope = self._semantic_text(prompt, params)
+        with self._lock:
+            vectors, responses = self._embeddings.get(scope, ([], []))
+            vectors, responses = list(vectors), list(responses)
+        if not vectors:
+            return None
+
+        similarities = np.stack(vectors) @ self._embed(text)
+        best = int(similarities.argmax())
+        if similarities[best] >= self.similarity_threshold:
+            return responses[best]
+        return None
+
+    def _semantic_set(self, prompt: str, response: str, params: dict) -> None:
+        """Index a prompt embedding under its generation settings."""
+        text, scope = self._semantic_text(prompt, params)
+        vector = self._embed(text)
+        with self._lock:
+            vectors, responses = self._embeddings.setdefault(scope, ([], []))
+            vectors.append(vector)
+            responses.append(response)
+            if len(vectors) > self.max_size:
+                del vectors[0]
+                del responses[0]
+
+# Shared by every LLMInterface in the process
+response_cache = LLMCache()
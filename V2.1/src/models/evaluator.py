@@ -2,18 +2,45 @@
 Evaluation module for feedback analysis.
 """
 from typing import Dict, List, Any, Optional
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from bert_score import score
 from transformers import AutoTokenizer, AutoModel
 import torch
-from ..config.settings import EVALUATION_METRICS
+from ..config.settings import (
+    EVALUATION_METRICS,
+    DEFAULT_MODEL,
+    SHAP_MAX_EVALS,
+    EXPLAINER_MAX_WORKERS
+)
 from .llm import LLMInterface
 
 class FeedbackEvaluator:
-    def __init__(self):
-        """Initialize the feedback evaluator."""
-        self.llm = LLMInterface()
+    def __init__(
+        self,
+        model_key: str = DEFAULT_MODEL,
+        llm: Optional[LLMInterface] = None
+    ):
+        """
+        Initialize the feedback evaluator.
+        
+        Args:
+            model_key: Key of the model configuration to evaluate with
+            llm: LLM interface to evaluate with; defaults to the shared
+                interface for model_key
+        """
+        self.llm = llm if llm is not None else LLMInterface.get(model_key)
         self.metrics = EVALUATION_METRICS
+        # SHAP masker and explainer are built on first use and reused
+        self._shap_masker = None
+        self._shap_model = None
+        self._shap_explainer = None
+        # BERTScorer instances keep their model loaded, keyed by model type
+        self._scorers: Dict[str, Any] = {}
+        # Metrics run in worker threads, so the lazily built objects above are
+        # created under this lock to avoid loading a model twice
+        self._lazy_lock = threading.Lock()
 
     def evaluate_with_bertscore(
         self,
@@ -32,13 +59,7 @@ class FeedbackEvaluator:
         Returns:
             Dictionary containing BERTScore metrics
         """
-        P, R, F1 = score(
-            candidates,
-            references,
-            lang="en",
-            model_type=model_type,
-            verbose=True
-        )
+        P, R, F1 = self._scorer(model_type).score(candidates, references)
         
         return {
             "precision": P.mean().item(),
@@ -46,6 +67,44 @@ class FeedbackEvaluator:
             "f1": F1.mean().item()
         }
 
+    def evaluate_batch_with_bertscore(
+        self,
+        references: List[str],
+        candidates: List[str],
+        model_type: str = "microsoft/deberta-xlarge-mnli"
+    ) -> List[Dict[str, float]]:
+        """
+        Score many (reference, candidate) pairs with one batched BERTScore call.
+        
+        Args:
+            references: List of reference feedback texts
+            candidates: List of candidate feedback texts, paired by position
+            model_type: Type of BERT model to use
+            
+        Returns:
+            BERTScore metrics for each pair, in order
+        """
+        P, R, F1 = self._scorer(model_type).score(candidates, references)
+        
+        return [
+            {"precision": p, "recall": r, "f1": f1}
+            for p, r, f1 in zip(P.tolist(), R.tolist(), F1.tolist())
+        ]
+
+    def _scorer(self, model_type: str) -> Any:
+        """Get the BERTScorer for a model type, loading it on first use."""
+        if model_type in self._scorers:
+            return self._scorers[model_type]
+        with self._lazy_lock:
+            if model_type not in self._scorers:
+                from bert_score import BERTScorer
+                self._scorers[model_type] = BERTScorer(
+                    model_type=model_type,
+                    lang="en",
+                    batch_size=64
+                )
+            return self._scorers[model_type]
+
     def evaluate_with_lime(
         self,
         text: str,
@@ -83,28 +142,37 @@ class FeedbackEvaluator:
         """
         Evaluate feedback using SHAP.
         
+        Uses Partition SHAP over a word-level text masker, which evaluates
+        the masked variants of the text in batches instead of sampling
+        feature coalitions like KernelExplainer.
+        
         Args:
             text: Input text to evaluate
             model: Model to explain
-            background_data: Background dataset for SHAP
+            background_data: Background dataset for SHAP; the text masker
+                derives its baseline from masking, so it is not sampled
             
         Returns:
             Dictionary containing SHAP values
         """
         import shap
         
-        # Create a background dataset
-        background = shap.sample(background_data, 100)
-        
-        # Create an explainer
-        explainer = shap.KernelExplainer(model.predict_proba, background)
+        with self._lazy_lock:
+            if self._shap_masker is None:
+                self._shap_masker = shap.maskers.Text(r"\W")
+            if self._shap_model is not model:
+                self._shap_explainer = shap.Explainer(model.predict_proba, self._shap_masker)
+                self._shap_model = model
+            explainer = self._shap_explainer
         
         # Calculate SHAP values
-        shap_values = explainer.shap_values(text)
+        explanation = explainer([text], max_evals=SHAP_MAX_EVALS)
+        shap_values = np.asarray(explanation.values[0])
         
         return {
+            "tokens": list(explanation.data[0]),
             "shap_values": shap_values.tolist(),
-            "feature_importance": np.abs(shap_values).mean(axis=0).tolist()
+            "feature_importance": np.abs(shap_values).mean(axis=-1).tolist()
         }
 
     def evaluate_with_llm(
@@ -122,6 +190,80 @@ class FeedbackEvaluator:
         """
         return self.llm.evaluate_feedback(feedback_text)
 
+    @staticmethod
+    def validate_references(feedbacks: List[str], references: Optional[List[str]]) -> None:
+        """
+        Check that BERTScore references pair up with the feedback texts.
+        
+        Args:
+            feedbacks: Texts to evaluate
+            references: Optional reference texts, one per text
+        """
+        if references is not None and len(references) != len(feedbacks):
+            raise ValueError(
+                f"Got {len(references)} references for {len(feedbacks)} feedback entries; "
+                "BERTScore needs one reference per entry"
+            )
+
+    def evaluate_many(
+        self,
+        feedbacks: List[str],
+        references: Optional[List[str]] = None,
+        model: Optional[Any] = None,
+        background_data: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Evaluate several feedback texts using all configured metrics.
+        
+        The LLM and BERTScore evaluations each run as one batched call over
+        all texts; the LIME and SHAP explanations run concurrently in a
+        thread pool.
+        
+        Args:
+            feedbacks: Texts to evaluate
+            references: Optional reference texts for BERTScore, one per text
+            model: Optional model for LIME/SHAP
+            background_data: Optional background data for SHAP
+            
+        Returns:
+            Evaluation results, in the same order as the texts
+        """
+        self.validate_references(feedbacks, references)
+        results = [{} for _ in feedbacks]
+        if not feedbacks:
+            return results
+        
+        if "bertscore" in self.metrics and references:
+            scores = self.evaluate_batch_with_bertscore(references, feedbacks)
+            for result, bertscore in zip(results, scores):
+                result["bertscore"] = bertscore
+        
+        explainers = []
+        if "lime" in self.metrics and model:
+            explainers.append(("lime", lambda text: self.evaluate_with_lime(text, model)))
+        if "shap" in self.metrics and model and background_data:
+            explainers.append((
+                "shap",
+                lambda text: self.evaluate_with_shap(text, model, background_data)
+            ))
+        if explainers:
+            # Model forward passes release the GIL, so explanations overlap
+            with ThreadPoolExecutor(max_workers=EXPLAINER_MAX_WORKERS) as executor:
+                futures = [
+                    (result, name, executor.submit(explain, text))
+                    for result, text in zip(results, feedbacks)
+                    for name, explain in explainers
+                ]
+                for result, name, future in futures:
+                    result[name] = future.result()
+        
+        if "llm_evaluation" in self.metrics:
+            evaluations = self.llm.evaluate_feedback_batch(feedbacks)
+            for result, evaluation in zip(results, evaluations):
+                result["llm_evaluation"] = evaluation
+            
+        return results
+
     def evaluate_feedback(
         self,
         feedback_text: str,
@@ -141,28 +283,61 @@ class FeedbackEvaluator:
         Returns:
             Dictionary containing all evaluation results
         """
-        results = {}
+        tasks = []
         
         if "bertscore" in self.metrics and reference_text:
-            results["bertscore"] = self.evaluate_with_bertscore(
+            tasks.append(("bertscore", lambda: self.evaluate_with_bertscore(
                 [reference_text],
                 [feedback_text]
-            )
+            )))
             
         if "lime" in self.metrics and model:
-            results["lime"] = self.evaluate_with_lime(feedback_text, model)
+            tasks.append(("lime", lambda: self.evaluate_with_lime(feedback_text, model)))
             
         if "shap" in self.metrics and model and background_data:
-            results["shap"] = self.evaluate_with_shap(
+            tasks.append(("shap", lambda: self.evaluate_with_shap(
                 feedback_text,
                 model,
                 background_data
-            )
+            )))
             
         if "llm_evaluation" in self.metrics:
-            results["llm_evaluation"] = self.evaluate_with_llm(feedback_text)
+            tasks.append(("llm_evaluation", lambda: self.evaluate_with_llm(feedback_text)))
+        
+        if len(tasks) <= 1:
+            return {name: evaluate() for name, evaluate in tasks}
+        
+        # The metrics use different models, so the GPU-bound and CPU-bound ones overlap
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = [(name, executor.submit(evaluate)) for name, evaluate in tasks]
+            return {name: future.result() for name, future in futures}
+
+    async def aevaluate_feedback(
+        self,
+        feedback_text: str,
+        reference_text: Optional[str] = None,
+        model: Optional[Any] = None,
+        background_data: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Evaluate feedback without blocking the event loop.
+        
+        Args:
+            feedback_text: Text to evaluate
+            reference_text: Optional reference text for BERTScore
+            model: Optional model for LIME/SHAP
+            background_data: Optional background data for SHAP
             
-        return results
+        Returns:
+            Dictionary containing all evaluation results
+        """
+        return await asyncio.to_thread(
+            self.evaluate_feedback,
+            feedback_text,
+            reference_text,
+            model,
+            background_data
+        )
 
     def compare_evaluations(
         self,
@@ -177,21 +352,50 @@ class FeedbackEvaluator:
         Returns:
             Dictionary containing comparison metrics
         """
+        # Classify each evaluation once, collecting the scores it carries
+        bertscores: List[Dict[str, float]] = []
+        llm_scores: List[float] = []
+        for evaluation in evaluations:
+            if "bertscore" in evaluation:
+                bertscores.append(evaluation["bertscore"])
+            if "llm_evaluation" in evaluation:
+                llm_scores.append(evaluation["llm_evaluation"]["score"])
+        
         comparison = {}
         
         # Compare BERTScore results if available
-        if all("bertscore" in eval for eval in evaluations):
+        if evaluations and len(bertscores) == len(evaluations):
             comparison["bertscore"] = {
-                "precision": [eval["bertscore"]["precision"] for eval in evaluations],
-                "recall": [eval["bertscore"]["recall"] for eval in evaluations],
-                "f1": [eval["bertscore"]["f1"] for eval in evaluations]
+                metric: _summarize(
+                    np.fromiter(
+                        (bertscore[metric] for bertscore in bertscores),
+                        dtype=np.float32,
+                        count=len(bertscores)
+                    )
+                )
+                for metric in ("precision", "recall", "f1")
             }
             
         # Compare LLM evaluation scores if available
-        if all("llm_evaluation" in eval for eval in evaluations):
-            comparison["llm_scores"] = [
-                eval["llm_evaluation"]["score"]
-                for eval in evaluations
-            ]
+        if evaluations and len(llm_scores) == len(evaluations):
+            comparison["llm_scores"] = _summarize(np.asarray(llm_scores, dtype=np.float32))
             
-        return comparison 
\ No newline at end of file
+        return comparison
+
+def _summarize(values: np.ndarray) -> Dict[str, Any]:
+    """
+    Summarize an array of scores.
+    
+    Args:
+        values: Scores to summarize
+        
+    Returns:
+        Dictionary with the values and their mean, std, min and max
+    """
+    return {
+        "values": values.tolist(),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max())
+    }
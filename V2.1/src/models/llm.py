@@ -1,49 +1,351 @@
 """
 LLM integration module for feedback analysis.
 """
+import asyncio
+import bisect
+import contextlib
+import copy
+import importlib.util
 import json
-from typing import Dict, Any, Optional
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Type
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
 import torch
 from ..config.settings import (
     MODEL_CONFIGS,
     DEFAULT_MODEL,
-    LLM_API_KEY
+    LLM_API_KEY,
+    BATCH_MAX_SIZE,
+    BATCH_LENGTH_BUCKETS,
+    EVAL_MAX_TOKENS,
+    LLM_TORCH_COMPILE,
+    LLM_GUIDED_JSON,
+    LLM_SPECULATIVE,
+    LLM_ATTN_IMPLEMENTATION,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_SIZE
 )
+from pydantic import BaseModel
+from ..data.loader import serialize_feedback
+from .backends import RemoteBackend
+from .cache import response_cache
+from .schemas import (
+    ClassAnalysis,
+    GroupAnalysis,
+    StudentAnalysis,
+    CombinedAnalysis,
+    FeedbackEvaluation
+)
+
+class ModelRegistry:
+    """Process-wide cache of loaded models and tokenizers, keyed by model key and quantization."""
+
+    _cache: Dict[Tuple[str, str], Tuple[AutoModelForCausalLM, AutoTokenizer]] = {}
+    _lock = threading.Lock()
+    # One lock per loaded model, held for every generate call on it
+    _generation_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    @classmethod
+    def get(
+        cls,
+        model_key: str,
+        quantization: str = "bf16"
+    ) -> Tuple[AutoModelForCausalLM, AutoTokenizer]:
+        """
+        Get the model and tokenizer for a configuration, loading them on first use.
+        
+        Args:
+            model_key: Key of the model configuration to use
+            quantization: Weight format, one of "bf16", "fp16", "int8" or "nf4"
+            
+        Returns:
+            Tuple of (model, tokenizer)
+        """
+        key = (model_key, quantization)
+        if key in cls._cache:
+            return cls._cache[key]
+        with cls._lock:
+            if key not in cls._cache:
+                cls._cache[key] = cls._load(model_key, quantization)
+            return cls._cache[key]
+
+    @classmethod
+    def generation_lock(cls, model_key: str, quantization: str = "bf16") -> threading.Lock:
+        """
+        Get the lock serializing generation on a shared model.
+        
+        Interfaces, the request batcher's worker and asyncio.to_thread
+        callers all share one set of weights, and concurrent generate calls
+        on the same model (and its KV cache buffers) are not safe, so each
+        takes this lock for the duration of the call.
+        
+        Args:
+            model_key: Key of the model configuration
+            quantization: Weight format of the loaded model
+            
+        Returns:
+            Lock shared by every user of the model
+        """
+        key = (model_key, quantization)
+        with cls._lock:
+            return cls._generation_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _quantization_kwargs(quantization: str) -> Dict[str, Any]:
+        """
+        Build the from_pretrained arguments for a quantization mode.
+        
+        Args:
+            quantization: One of "bf16", "fp16", "int8" or "nf4"
+            
+        Returns:
+            Keyword arguments selecting the weight format
+        """
+        if quantization == "bf16":
+            # GPUs before Ampere have no bf16 tensor cores, so fp16 is used there
+            if torch.cuda.is_available() and not torch.cuda.is_bf16_supported():
+                return {"torch_dtype": torch.float16}
+            return {"torch_dtype": torch.bfloat16}
+        if quantization == "fp16":
+            return {"torch_dtype": torch.float16}
+        if quantization == "int8":
+            return {"quantization_config": BitsAndBytesConfig(load_in_8bit=True)}
+        if quantization == "nf4":
+            return {
+                "quantization_config": BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_compute_dtype=torch.bfloat16,
+                    bnb_4bit_use_double_quant=True
+                )
+            }
+        raise ValueError(f"Unknown quantization {quantization}, expected bf16, fp16, int8 or nf4")
+
+    @staticmethod
+    def _attn_implementation() -> str:
+        """
+        Pick the attention kernel for loaded models.
+        
+        FlashAttention-2 computes attention in tiles without materializing
+        the full score matrix, but needs the flash-attn package and an
+        Ampere or newer GPU (compute capability 8.0); otherwise PyTorch's
+        fused scaled_dot_product_attention is used.
+        
+        Returns:
+            Value for the attn_implementation argument of from_pretrained
+        """
+        if LLM_ATTN_IMPLEMENTATION:
+            return LLM_ATTN_IMPLEMENTATION
+        if torch.cuda.is_available() and torch.cuda.get_device_capability()[0] >= 8:
+            try:
+                import flash_attn  # noqa: F401
+            except ImportError:
+                pass
+            else:
+                return "flash_attention_2"
+        return "sdpa"
+
+    @staticmethod
+    def _load(model_key: str, quantization: str) -> Tuple[AutoModelForCausalLM, AutoTokenizer]:
+        """Load a model and tokenizer from the Hugging Face Hub."""
+        model_config = MODEL_CONFIGS[model_key]
+        model_name = model_config["name"]
+        
+        # Layers left in fp32 (and int8 outlier matmuls) run on TF32 tensor cores
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+        
+        tokenizer = AutoTokenizer.from_pretrained(
+            model_name,
+            token=LLM_API_KEY
+        )
+        # Left padding keeps every prompt in a batch flush with the generated tokens
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        model = AutoModelForCausalLM.from_pretrained(
+            model_name,
+            token=LLM_API_KEY,
+            device_map="auto",
+            attn_implementation=ModelRegistry._attn_implementation(),
+            **ModelRegistry._quantization_kwargs(quantization)
+        )
+        if LLM_TORCH_COMPILE:
+            ModelRegistry._compile(model, tokenizer)
+        return model, tokenizer
+
+    @staticmethod
+    def _compile(model: AutoModelForCausalLM, tokenizer: AutoTokenizer) -> None:
+        """
+        Compile the model's forward pass and warm it up.
+        
+        Only forward is compiled, so model.generate keeps working and runs
+        the compiled graph for every decoding step. A short generate call
+        triggers compilation at load time rather than on the first request.
+        Models that fail to compile keep running eagerly.
+        
+        Args:
+            model: Loaded model
+            tokenizer: Matching tokenizer
+        """
+        try:
+            model.forward = torch.compile(model.forward, mode="reduce-overhead", fullgraph=False)
+            inputs = tokenizer(["Warm up"], return_tensors="pt").to(model.device)
+            with torch.no_grad():
+                model.generate(
+                    **inputs,
+                    max_new_tokens=2,
+                    do_sample=False,
+                    pad_token_id=tokenizer.pad_token_id
+                )
+        except Exception:
+            # Fall back to the eager forward pass
+            del model.forward
 
 class LLMInterface:
-    def __init__(self, model_key: str = DEFAULT_MODEL):
+    # Shared interfaces returned by LLMInterface.get, keyed by model key and quantization
+    _instances: Dict[Tuple[str, Optional[str]], "LLMInterface"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, model_key: str = DEFAULT_MODEL, quantization: Optional[str] = None):
         """
         Initialize the LLM interface with the specified model.
         
         Args:
             model_key: Key of the model configuration to use
+            quantization: Weight format ("bf16", "fp16", "int8" or "nf4") overriding
+                the configuration's; ignored by remote backends
         """
         if model_key not in MODEL_CONFIGS:
             raise ValueError(f"Model {model_key} not found in configurations")
             
+        self.model_key = model_key
         self.model_config = MODEL_CONFIGS[model_key]
         self.model_name = self.model_config["name"]
         self.max_tokens = self.model_config["max_tokens"]
         self.temperature = self.model_config["temperature"]
         self.context_length = self.model_config["context_length"]
+        self.quantization = quantization or self.model_config.get("quantization", "bf16")
         
-        self.tokenizer = AutoTokenizer.from_pretrained(
-            self.model_name,
-            token=LLM_API_KEY
-        )
-        self.model = AutoModelForCausalLM.from_pretrained(
-            self.model_name,
-            token=LLM_API_KEY,
-            torch_dtype=torch.float16,
-            device_map="auto"
-        )
+        self.backend = self.model_config.get("backend", "hf")
+        # Local weights are shared by every interface using the same model and
+        # loaded from the registry on first use of model or tokenizer, so an
+        # interface whose calls are all answered elsewhere never loads them
+        self._model: Optional[AutoModelForCausalLM] = None
+        self._tokenizer: Optional[AutoTokenizer] = None
+        self._weights_lock = threading.Lock()
+        if self.backend == "hf":
+            self._generation_lock = ModelRegistry.generation_lock(model_key, self.quantization)
+            self.remote = None
+        else:
+            # A vLLM or Ollama server holds the weights and batches requests itself
+            self.remote = RemoteBackend(self.model_name, self.model_config["base_url"])
+        
+        # Smaller model sharing the tokenizer that proposes tokens for the
+        # target to verify (speculative decoding of single prompts); loads a
+        # second model, so only with LLM_SPECULATIVE=1
+        self._draft_model: Optional[AutoModelForCausalLM] = None
+        self._draft_key = None
+        self._draft_lock = None
+        draft_key = self.model_config.get("draft_model")
+        if self.remote is None and draft_key and LLM_SPECULATIVE:
+            self._draft_key = draft_key
+            self._draft_lock = ModelRegistry.generation_lock(draft_key, self.quantization)
+
+        # Prompts start with one of a few fixed prefixes (the analysis system
+        # text, the evaluation template's opening); each is tokenized when the
+        # weights load and its KV cache computed on first use
+        self._prefix_ids: Dict[str, List[int]] = {}
+        self._prefix_caches: Dict[str, Any] = {}
+        self._prefix_lock = threading.Lock()
+
+        # outlines wrapper around the loaded model for schema-guided decoding;
+        # built on first use, False when guided decoding is unavailable
+        self._outlines_model: Any = None
+        self._json_generators: Dict[Tuple[Type[BaseModel], Optional[float]], Any] = {}
+        
+        # Sections produced by analyze_all, returned by the per-level
+        # analyze methods when called again with the same data
+        self._analysis_memo: "OrderedDict[Tuple[str, ...], Dict[str, Any]]" = OrderedDict()
+
+        # Optional RequestBatcher that coalesces concurrent generate_response calls
+        self.batcher = None
+        # Responses are looked up here before anything is sent to the model
+        self.cache = response_cache if LLM_CACHE_ENABLED else None
+
+    @property
+    def model(self) -> Optional[AutoModelForCausalLM]:
+        """Local model, loaded on first use; None for remote backends."""
+        self._load_weights()
+        return self._model
+
+    @property
+    def tokenizer(self) -> Optional[AutoTokenizer]:
+        """Tokenizer of the local model, loaded with it; None for remote backends."""
+        self._load_weights()
+        return self._tokenizer
+
+    @property
+    def draft_model(self) -> Optional[AutoModelForCausalLM]:
+        """Draft model for speculative decoding, loaded with the target; None when disabled."""
+        self._load_weights()
+        return self._draft_model
+
+    @draft_model.setter
+    def draft_model(self, model: Optional[AutoModelForCausalLM]) -> None:
+        self._draft_model = model
+
+    def _load_weights(self) -> None:
+        """Get the local model, tokenizer and draft model from the registry, once."""
+        if self.remote is not None or self._model is not None:
+            return
+        with self._weights_lock:
+            if self._model is not None:
+                return
+            model, tokenizer = ModelRegistry.get(self.model_key, self.quantization)
+            if self._draft_key is not None:
+                self._draft_model, _ = ModelRegistry.get(self._draft_key, self.quantization)
+            
+            from ..config.prompts import ANALYSIS_SYSTEM_PREFIX, evaluation_prompt
+            for prefix in (ANALYSIS_SYSTEM_PREFIX, evaluation_prompt.literals[0]):
+                self._prefix_ids[prefix] = tokenizer(prefix)["input_ids"]
+            
+            # Set last, as it marks the weights as loaded for other threads
+            self._tokenizer = tokenizer
+            self._model = model
+
+    @classmethod
+    def get(
+        cls,
+        model_key: str = DEFAULT_MODEL,
+        quantization: Optional[str] = None
+    ) -> "LLMInterface":
+        """
+        Get the shared interface for a model, creating it on first use.
+        
+        Args:
+            model_key: Key of the model configuration to use
+            quantization: Optional weight format overriding the configuration's
+            
+        Returns:
+            LLMInterface shared by every caller using the same model key and quantization
+        """
+        key = (model_key, quantization)
+        if key in cls._instances:
+            return cls._instances[key]
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(model_key, quantization)
+            return cls._instances[key]
 
     def generate_response(
         self,
         prompt: str,
         max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        deterministic: bool = False,
+        schema: Optional[Type[BaseModel]] = None
     ) -> str:
         """
         Generate a response from the LLM based on the input prompt.
@@ -52,25 +354,461 @@ class LLMInterface:
             prompt: The input prompt
             max_tokens: Maximum number of tokens to generate
             temperature: Sampling temperature
+            deterministic: Use greedy decoding instead of sampling
+            schema: Optional Pydantic model the response is constrained to
+            
+        Returns:
+            Generated response as string
+        """
+        if self.batcher is not None and self.batcher.is_running:
+            return self.batcher.submit_threadsafe(
+                prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                deterministic=deterministic,
+                schema=schema
+            )
+        return self.generate_batch([prompt], max_tokens, temperature, deterministic, schema)[0]
+
+    async def agenerate_response(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        deterministic: bool = False
+    ) -> str:
+        """
+        Generate a response without blocking the event loop.
+        
+        The blocking generate_response call runs in a worker thread, so several
+        awaited calls overlap (and are coalesced when a batcher is running).
+        
+        Args:
+            prompt: The input prompt
+            max_tokens: Maximum number of tokens to generate
+            temperature: Sampling temperature
+            deterministic: Use greedy decoding instead of sampling
             
         Returns:
             Generated response as string
         """
+        return await asyncio.to_thread(
+            self.generate_response,
+            prompt,
+            max_tokens,
+            temperature,
+            deterministic
+        )
+
+    def generate_batch(
+        self,
+        prompts: List[str],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        deterministic: bool = False,
+        schema: Optional[Type[BaseModel]] = None
+    ) -> List[str]:
+        """
+        Generate responses for several prompts with a single model.generate call.
+        
+        Args:
+            prompts: The input prompts
+            max_tokens: Maximum number of tokens to generate
+            temperature: Sampling temperature; 0 selects greedy decoding
+            deterministic: Use greedy decoding instead of sampling
+            schema: Optional Pydantic model the responses are constrained to
+                (see generate_json)
+            
+        Returns:
+            Generated responses, in the same order as the prompts
+        """
         max_tokens = max_tokens or self.max_tokens
-        temperature = temperature or self.temperature
+        temperature = self.temperature if temperature is None else temperature
+        greedy = deterministic or temperature == 0
 
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+        # Only greedy responses are reproducible, so sampled ones are never cached
+        cache = self.cache if greedy else None
+        cache_params = {
+            "model": self.model_name,
+            "quantization": self.quantization,
+            "max_tokens": max_tokens,
+            "greedy": True
+        }
+        # A schema only changes the responses when something enforces it
+        if schema is not None and self._schema_enforced():
+            cache_params["schema"] = schema.model_json_schema()
+        if cache is not None:
+            responses = [self.cache.get(prompt, **cache_params) for prompt in prompts]
+        else:
+            responses = [None] * len(prompts)
+        pending = [i for i, response in enumerate(responses) if response is None]
+        
+        for chunk, input_ids in self._length_batches(prompts, pending):
+            generated = self._generate(
+                [prompts[i] for i in chunk],
+                max_tokens,
+                temperature,
+                greedy,
+                schema,
+                input_ids
+            )
+            for i, response in zip(chunk, generated):
+                responses[i] = response
+                if cache is not None:
+                    cache.set(prompts[i], response, **cache_params)
+        return responses
+
+    def _length_batches(
+        self,
+        prompts: List[str],
+        indices: List[int]
+    ) -> List[Tuple[List[int], Optional[List[List[int]]]]]:
+        """
+        Split prompts into generate calls of similar token length.
+        
+        A padded batch runs every prompt to the length of its longest, so
+        prompts are sorted by token count and binned at BATCH_LENGTH_BUCKETS
+        before being cut into batches of at most BATCH_MAX_SIZE, which keeps
+        very long prompt lists from exhausting GPU memory. Remote servers
+        schedule requests themselves and only get the size cap.
+        
+        Args:
+            prompts: The input prompts
+            indices: Positions of the prompts still to generate
+            
+        Returns:
+            (prompt positions, token ids) pairs, one per generate call; the
+            ids are those counted for the bucketing, so the prompts are not
+            tokenized again, and None where no prompt was tokenized
+        """
+        bins = [indices]
+        token_ids: Dict[int, List[int]] = {}
+        if self.remote is None and len(indices) > 1:
+            input_ids = self.tokenizer([prompts[i] for i in indices])["input_ids"]
+            token_ids = dict(zip(indices, input_ids))
+            
+            buckets: Dict[int, List[int]] = {}
+            for i in sorted(indices, key=lambda i: len(token_ids[i])):
+                buckets.setdefault(bisect.bisect_right(BATCH_LENGTH_BUCKETS, len(token_ids[i])), []).append(i)
+            bins = list(buckets.values())
+        
+        chunks = [
+            bin_indices[start:start + BATCH_MAX_SIZE]
+            for bin_indices in bins
+            for start in range(0, len(bin_indices), BATCH_MAX_SIZE)
+        ]
+        return [(chunk, [token_ids[i] for i in chunk] if token_ids else None) for chunk in chunks]
+
+    def _generate(
+        self,
+        prompts: List[str],
+        max_tokens: int,
+        temperature: float,
+        greedy: bool = False,
+        schema: Optional[Type[BaseModel]] = None,
+        input_ids: Optional[List[List[int]]] = None
+    ) -> List[str]:
+        """
+        Run one padded model.generate call over the prompts, or send them to the remote server.
+        
+        With a schema and outlines available, local prompts are decoded
+        under the schema instead. Otherwise a lone local prompt is decoded
+        speculatively when a draft model is loaded, or else with the KV cache
+        of its registered prefix if it has one; batches always take the
+        padded path, padding input_ids when the prompts are already tokenized.
+        """
+        if self.remote is not None:
+            return self.remote.generate_batch(
+                prompts,
+                max_tokens,
+                0 if greedy else temperature,
+                json_schema=schema.model_json_schema() if schema is not None and LLM_GUIDED_JSON else None
+            )
+        
+        # The draft model may itself be another interface's target model
+        with self._generation_lock, self._draft_lock or contextlib.nullcontext():
+            return self._generate_local(prompts, max_tokens, temperature, greedy, schema, input_ids)
+
+    def _generate_local(
+        self,
+        prompts: List[str],
+        max_tokens: int,
+        temperature: float,
+        greedy: bool,
+        schema: Optional[Type[BaseModel]],
+        input_ids: Optional[List[List[int]]] = None
+    ) -> List[str]:
+        """Generate with the local model; callers hold its generation lock."""
+        guided_model = None if schema is None else self._guided_model()
+        if guided_model is not None:
+            return self._generate_guided(guided_model, prompts, schema, max_tokens, temperature, greedy)
+        
+        # A lone prompt with a known prefix only needs the rest prefilled,
+        # unless its tokens differ at the boundary and it falls through to a
+        # full prefill; padded batches cannot share one prefix cache. An
+        # enabled draft model takes precedence, as it has no matching prefix
+        # cache of its own
+        if len(prompts) == 1 and self.draft_model is None:
+            prefix = self._match_prefix(prompts[0])
+            if prefix is not None:
+                response = self._generate_with_prefix(
+                    prefix,
+                    prompts[0],
+                    max_tokens,
+                    temperature,
+                    greedy,
+                    None if input_ids is None else input_ids[0]
+                )
+                if response is not None:
+                    return [response]
+        
+        inputs = self._tokenize(prompts, input_ids)
         
         outputs = self.model.generate(
             **inputs,
             max_new_tokens=max_tokens,
-            temperature=temperature,
-            do_sample=True,
-            pad_token_id=self.tokenizer.eos_token_id
+            pad_token_id=self.tokenizer.pad_token_id,
+            **self._assistant_kwargs(len(prompts)),
+            **self._decoding_kwargs(temperature, greedy)
         )
         
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return response
+        # Only decode the generated continuation, not the echoed prompt
+        prompt_length = inputs["input_ids"].shape[1]
+        return self.tokenizer.batch_decode(
+            outputs[:, prompt_length:],
+            skip_special_tokens=True
+        )
+
+    def _assistant_kwargs(self, batch_size: int) -> Dict[str, Any]:
+        """
+        Build the generate arguments enabling speculative decoding.
+        
+        transformers only supports assisted generation for one sequence at
+        a time, so batches decode with the target model alone.
+        
+        Args:
+            batch_size: Number of prompts in the generate call
+            
+        Returns:
+            Keyword arguments passing the draft model, or none
+        """
+        if self.draft_model is None or batch_size != 1:
+            return {}
+        return {"assistant_model": self.draft_model}
+
+    def _match_prefix(self, prompt: str) -> Optional[str]:
+        """Return the longest registered prefix the prompt starts with, if any."""
+        matches = [prefix for prefix in self._prefix_ids if prompt.startswith(prefix)]
+        return max(matches, key=len) if matches else None
+
+    def _generate_with_prefix(
+        self,
+        prefix: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        greedy: bool,
+        input_ids: Optional[List[int]] = None
+    ) -> Optional[str]:
+        """
+        Generate a response, reusing the key/value cache of the prompt's prefix.
+        
+        The whole prompt is tokenized, and generate only runs the model over
+        the positions after the prefix. Each call decodes from its own copy
+        of the prefix cache, so the stored one always holds just the prefix.
+        
+        Args:
+            prefix: Registered prefix the prompt starts with
+            prompt: The input prompt
+            max_tokens: Maximum number of tokens to generate
+            temperature: Sampling temperature
+            greedy: Whether to decode greedily
+            input_ids: Token ids of the prompt, if already tokenized
+            
+        Returns:
+            Generated response as string, or None when the prompt's tokens do
+            not start with the prefix's and it needs a full prefill
+        """
+        prefix_ids = self._prefix_ids[prefix]
+        if input_ids is None:
+            input_ids = self.tokenizer(prompt)["input_ids"]
+        # Text continuing the prefix can merge with its last characters into
+        # one token (a trailing newline, say), so the cache only applies when
+        # the prompt's own tokenization starts with the prefix tokens
+        if len(input_ids) <= len(prefix_ids) or input_ids[:len(prefix_ids)] != prefix_ids:
+            return None
+        
+        with self._prefix_lock:
+            if prefix not in self._prefix_caches:
+                with torch.no_grad():
+                    self._prefix_caches[prefix] = self.model(
+                        torch.tensor([prefix_ids], device=self.model.device),
+                        use_cache=True
+                    ).past_key_values
+        
+        input_ids = torch.tensor([input_ids], device=self.model.device)
+        
+        # Cache objects (DynamicCache, transformers >= 4.38) are extended in
+        # place during decoding, so generate gets a copy of the prefix cache
+        outputs = self.model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            past_key_values=copy.deepcopy(self._prefix_caches[prefix]),
+            max_new_tokens=max_tokens,
+            pad_token_id=self.tokenizer.pad_token_id,
+            **self._decoding_kwargs(temperature, greedy)
+        )
+        return self.tokenizer.decode(
+            outputs[0, input_ids.shape[1]:],
+            skip_special_tokens=True
+        )
+
+    def _tokenize(self, prompts: List[str], input_ids: Optional[List[List[int]]] = None) -> Any:
+        """
+        Tokenize and left-pad prompts.
+        
+        Args:
+            prompts: The input prompts
+            input_ids: Token ids of the prompts, if already tokenized; only
+                padded then
+            
+        Returns:
+            Padded input_ids and attention_mask on the model's device
+        """
+        if input_ids is not None:
+            return self.tokenizer.pad(
+                {"input_ids": input_ids},
+                return_tensors="pt"
+            ).to(self.model.device)
+        return self.tokenizer(
+            prompts,
+            return_tensors="pt",
+            padding=True
+        ).to(self.model.device)
+
+    @staticmethod
+    def _decoding_kwargs(temperature: float, greedy: bool) -> Dict[str, Any]:
+        """
+        Build the model.generate arguments selecting greedy decoding or sampling.
+        
+        Args:
+            temperature: Sampling temperature
+            greedy: Whether to decode greedily
+            
+        Returns:
+            Keyword arguments for model.generate
+        """
+        if greedy:
+            # Clear the sampling settings from the model's generation config
+            return {
+                "do_sample": False,
+                "num_beams": 1,
+                "temperature": None,
+                "top_p": None,
+                "use_cache": True
+            }
+        return {"do_sample": True, "temperature": temperature, "use_cache": True}
+
+    def _schema_enforced(self) -> bool:
+        """Whether a schema passed to generate_batch constrains decoding; checked without loading the weights."""
+        if not LLM_GUIDED_JSON:
+            return False
+        return self.remote is not None or importlib.util.find_spec("outlines") is not None
+
+    def _guided_model(self) -> Optional[Any]:
+        """Get the outlines model for guided decoding, or None when it is unavailable."""
+        if self._outlines_model is None:
+            self._outlines_model = False
+            if LLM_GUIDED_JSON and self.remote is None:
+                try:
+                    import outlines
+                except ImportError:
+                    pass
+                else:
+                    # Wraps the already loaded weights, so no extra memory is used
+                    self._outlines_model = outlines.models.Transformers(self.model, self.tokenizer)
+        return self._outlines_model or None
+
+    def _generate_guided(
+        self,
+        guided_model: Any,
+        prompts: List[str],
+        schema: Type[BaseModel],
+        max_tokens: int,
+        temperature: float,
+        greedy: bool
+    ) -> List[str]:
+        """
+        Generate responses constrained to a schema with outlines.
+        
+        Args:
+            guided_model: outlines wrapper around the loaded model
+            prompts: The input prompts
+            schema: Pydantic model the responses must follow
+            max_tokens: Maximum number of tokens to generate
+            temperature: Sampling temperature
+            greedy: Whether to decode greedily
+            
+        Returns:
+            Responses serialized as JSON, in the same order as the prompts
+        """
+        import outlines
+        
+        # Greedy decoding is its own outlines sampler rather than a zero temperature
+        key = (schema, None if greedy else temperature)
+        generator = self._json_generators.get(key)
+        if generator is None:
+            if greedy:
+                sampler = outlines.samplers.greedy()
+            else:
+                sampler = outlines.samplers.multinomial(temperature=temperature)
+            generator = outlines.generate.json(guided_model, schema, sampler=sampler)
+            self._json_generators[key] = generator
+        
+        return [output.model_dump_json() for output in generator(prompts, max_tokens=max_tokens)]
+
+    def generate_json(
+        self,
+        prompts: List[str],
+        schema: Type[BaseModel],
+        max_tokens: Optional[int] = None,
+        deterministic: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate JSON responses that follow a schema.
+        
+        With outlines installed and a local model, decoding is constrained to
+        the schema so every response parses in one pass. vLLM and Ollama
+        servers are sent the schema as a json_schema response format and
+        constrain decoding themselves. Otherwise the responses are generated
+        freely. Either way they go through generate_response or
+        generate_batch, so the response cache and the batcher apply, and are
+        parsed with json.loads.
+        
+        Args:
+            prompts: The input prompts
+            schema: Pydantic model the responses must follow
+            max_tokens: Maximum number of tokens to generate
+            deterministic: Use greedy decoding instead of sampling
+            
+        Returns:
+            Parsed responses, in the same order as the prompts
+        """
+        if len(prompts) == 1:
+            responses = [self.generate_response(
+                prompts[0],
+                max_tokens,
+                deterministic=deterministic,
+                schema=schema
+            )]
+        else:
+            responses = self.generate_batch(
+                prompts,
+                max_tokens,
+                deterministic=deterministic,
+                schema=schema
+            )
+        return [json.loads(response) for response in responses]
 
     def analyze_class_level(self, feedback_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -82,14 +820,16 @@ class LLMInterface:
         Returns:
             Analysis results as dictionary
         """
-        from ..config.prompts import CLASS_LEVEL_PROMPT
+        from ..config.prompts import class_level_prompt
         
-        prompt = CLASS_LEVEL_PROMPT.format(
-            feedback_data=json.dumps(feedback_data, indent=2)
-        )
+        serialized = serialize_feedback(feedback_data)
+        memo_key = ("class", serialized)
+        if memo_key in self._analysis_memo:
+            return self._analysis_memo[memo_key]
         
-        response = self.generate_response(prompt)
-        return json.loads(response)
+        prompt = class_level_prompt(feedback_data=serialized)
+        
+        return self.generate_json([prompt], ClassAnalysis)[0]
 
     def analyze_group_level(self, group_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -101,14 +841,16 @@ class LLMInterface:
         Returns:
             Analysis results as dictionary
         """
-        from ..config.prompts import GROUP_LEVEL_PROMPT
+        from ..config.prompts import group_level_prompt
         
-        prompt = GROUP_LEVEL_PROMPT.format(
-            group_data=json.dumps(group_data, indent=2)
-        )
+        serialized = serialize_feedback(group_data)
+        memo_key = ("group", serialized)
+        if memo_key in self._analysis_memo:
+            return self._analysis_memo[memo_key]
         
-        response = self.generate_response(prompt)
-        return json.loads(response)
+        prompt = group_level_prompt(group_data=serialized)
+        
+        return self.generate_json([prompt], GroupAnalysis)[0]
 
     def analyze_student_level(
         self,
@@ -125,15 +867,77 @@ class LLMInterface:
         Returns:
             Analysis results as dictionary
         """
-        from ..config.prompts import STUDENT_LEVEL_PROMPT
+        from ..config.prompts import student_level_prompt
+        
+        serialized = serialize_feedback(student_data)
+        memo_key = ("student", serialized, framework)
+        if memo_key in self._analysis_memo:
+            return self._analysis_memo[memo_key]
         
-        prompt = STUDENT_LEVEL_PROMPT.format(
-            student_data=json.dumps(student_data, indent=2),
+        prompt = student_level_prompt(
+            student_data=serialized,
             framework=framework
         )
         
-        response = self.generate_response(prompt)
-        return json.loads(response)
+        return self.generate_json([prompt], StudentAnalysis)[0]
+
+    def analyze_all(
+        self,
+        feedback_data: Dict[str, Any],
+        group_data: Dict[str, Any],
+        student_data: Dict[str, Any],
+        framework: str = "ICAP"
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze feedback at the class, group and student level in one generation.
+        
+        The three analyses share one prompt and one generate call instead of
+        three. Each section is remembered, so a later analyze_class_level,
+        analyze_group_level or analyze_student_level call with the same data
+        returns it without generating again.
+        
+        Args:
+            feedback_data: Dictionary containing class feedback data
+            group_data: Dictionary containing group feedback data
+            student_data: Dictionary containing student feedback data
+            framework: Analysis framework to use for the student (e.g., "ICAP")
+            
+        Returns:
+            Dictionary with "class", "group" and "student" analysis results
+        """
+        from ..config.prompts import combined_analysis_prompt
+        
+        serialized = {
+            "class": serialize_feedback(feedback_data),
+            "group": serialize_feedback(group_data),
+            "student": serialize_feedback(student_data)
+        }
+        prompt = combined_analysis_prompt(
+            feedback_data=serialized["class"],
+            group_data=serialized["group"],
+            student_data=serialized["student"],
+            framework=framework
+        )
+        
+        # The response holds three analyses, so it gets three analyses' budget
+        response = self.generate_json([prompt], CombinedAnalysis, max_tokens=3 * self.max_tokens)[0]
+        results = {
+            "class": response["class_level"],
+            "group": response["group_level"],
+            "student": response["student_level"]
+        }
+        
+        self._remember_analysis(("class", serialized["class"]), results["class"])
+        self._remember_analysis(("group", serialized["group"]), results["group"])
+        self._remember_analysis(("student", serialized["student"], framework), results["student"])
+        return results
+
+    def _remember_analysis(self, key: Tuple[str, ...], analysis: Dict[str, Any]) -> None:
+        """Store an analyze_all section, evicting the oldest once the memo is full."""
+        self._analysis_memo[key] = analysis
+        self._analysis_memo.move_to_end(key)
+        while len(self._analysis_memo) > LLM_CACHE_SIZE:
+            self._analysis_memo.popitem(last=False)
 
     def evaluate_feedback(self, feedback_text: str) -> Dict[str, Any]:
         """
@@ -145,12 +949,94 @@ class LLMInterface:
         Returns:
             Evaluation results as dictionary
         """
-        from ..config.prompts import EVALUATION_PROMPT
+        from ..config.prompts import evaluation_prompt
+        
+        prompt = evaluation_prompt(feedback_text=feedback_text)
+        
+        # Scores are parsed as JSON, so decode greedily within a JSON-sized budget
+        return self.generate_json(
+            [prompt],
+            FeedbackEvaluation,
+            max_tokens=min(self.max_tokens, EVAL_MAX_TOKENS),
+            deterministic=True
+        )[0]
+
+    def evaluate_feedback_batch(self, feedback_texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Evaluate the quality of several feedback texts with batched generation.
+        
+        Args:
+            feedback_texts: The feedback texts to evaluate
+            
+        Returns:
+            Evaluation results, in the same order as the texts
+        """
+        from ..config.prompts import evaluation_prompt
+        
+        prompts = [
+            evaluation_prompt(feedback_text=feedback_text)
+            for feedback_text in feedback_texts
+        ]
+        
+        return self.generate_json(
+            prompts,
+            FeedbackEvaluation,
+            max_tokens=min(self.max_tokens, EVAL_MAX_TOKENS),
+            deterministic=True
+        )
+
+    async def aanalyze_class_level(self, feedback_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analyze feedback at the class level without blocking the event loop.
+        
+        Args:
+            feedback_data: Dictionary containing feedback data
+            
+        Returns:
+            Analysis results as dictionary
+        """
+        return await asyncio.to_thread(self.analyze_class_level, feedback_data)
+
+    async def aanalyze_group_level(self, group_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analyze feedback at the group level without blocking the event loop.
         
-        prompt = EVALUATION_PROMPT.format(feedback_text=feedback_text)
+        Args:
+            group_data: Dictionary containing group feedback data
+            
+        Returns:
+            Analysis results as dictionary
+        """
+        return await asyncio.to_thread(self.analyze_group_level, group_data)
+
+    async def aanalyze_student_level(
+        self,
+        student_data: Dict[str, Any],
+        framework: str = "ICAP"
+    ) -> Dict[str, Any]:
+        """
+        Analyze feedback at the student level without blocking the event loop.
         
-        response = self.generate_response(prompt)
-        return json.loads(response)
+        Args:
+            student_data: Dictionary containing student feedback data
+            framework: Analysis framework to use (e.g., "ICAP")
+            
+        Returns:
+            Analysis results as dictionary
+        """
+        return await asyncio.to_thread(self.analyze_student_level, student_data, framework)
+
+    async def aevaluate_feedback(self, feedback_text: str) -> Dict[str, Any]:
+        """
+        Evaluate the quality of feedback without blocking the event loop.
+        
+        Args:
+            feedback_text: The feedback text to evaluate
+            
+        Returns:
+            Evaluation results as dictionary
+        """
+        return await asyncio.to_thread(self.evaluate_feedback, feedback_text)
 
     @classmethod
     def get_available_models(cls) -> Dict[str, Dict[str, Any]]:
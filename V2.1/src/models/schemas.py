@@ -0,0 +1,50 @@
+"""
+Response schemas for the structured JSON the LLM is asked to produce.
+"""
+from typing import Any, Dict, List
+from pydantic import BaseModel
+
+class ClassAnalysis(BaseModel):
+    """Response to the class-level analysis prompt."""
+    overall_trends: Dict[str, Any]
+    group_comparisons: Dict[str, Any]
+    topic_analysis: Dict[str, Any]
+    assessment_alignment: Dict[str, Any]
+    attention_needed: Dict[str, Any]
+    challenge_needed: Dict[str, Any]
+
+class GroupAnalysis(BaseModel):
+    """Response to the group-level analysis prompt."""
+    group_dynamics: Dict[str, Any]
+    contributions: Dict[str, Any]
+    topic_mastery: Dict[str, Any]
+    improvement_areas: Dict[str, Any]
+    achievements: Dict[str, Any]
+
+class StudentAnalysis(BaseModel):
+    """Response to the student-level analysis prompt."""
+    framework_analysis: Dict[str, Any]
+    strengths: List[str]
+    improvement_areas: List[str]
+    recommendations: List[str]
+    patterns: Dict[str, Any]
+
+class CombinedAnalysis(BaseModel):
+    """Response to the combined class, group and student analysis prompt."""
+    class_level: ClassAnalysis
+    group_level: GroupAnalysis
+    student_level: StudentAnalysis
+
+class CriterionScores(BaseModel):
+    """Per-criterion scores of a feedback evaluation."""
+    specificity: float
+    constructiveness: float
+    actionability: float
+    alignment: float
+    evidence: float
+
+class FeedbackEvaluation(BaseModel):
+    """Response to the feedback evaluation prompt."""
+    score: float
+    justification: str
+    criterion_scores: CriterionScores
@@ -1,15 +1,128 @@
 """
 Test configuration and fixtures.
 """
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
 import pytest
 import pandas as pd
-from pathlib import Path
 import json
-from src.config.settings import RAW_DATA_DIR, PROCESSED_DATA_DIR
-from src.models.llm import LLMInterface
+from src.config.settings import (
+    RAW_DATA_DIR,
+    PROCESSED_DATA_DIR,
+    MODEL_CONFIGS,
+    LLM_SPECULATIVE
+)
 from src.data.loader import DataLoader
-from src.models.evaluator import FeedbackEvaluator
-from src.analysis.analyzer import FeedbackAnalyzer
+
+# The model stack (torch, transformers, httpx, diskcache) is imported inside
+# the fixtures that need it, so tests of the data layer run without it
+
+# Recorded model responses, replayed instead of calling the model
+CASSETTE_PATH = Path(__file__).resolve().parent / "fixtures" / "llm_cassette.json"
+# Greedy responses persist between test runs, so repeat runs skip decoding
+CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "llm"
+
+# Tests that need a live model are skipped unless --llm or TEAMPRISM_LLM_TESTS=1;
+# the rest are answered from the cassette
+RUN_LLM_TESTS = os.getenv("TEAMPRISM_LLM_TESTS", "0") == "1"
+# Fixtures that build their own model state, so are never served by the cassette
+LIVE_FIXTURES = ("uncached_llm", "feedback_evaluator", "feedback_analyzer")
+
+def pytest_addoption(parser):
+    """Add the --record option for refreshing the LLM cassette and --llm for the model tests."""
+    parser.addoption(
+        "--record",
+        action="store_true",
+        default=False,
+        help="Call the real model and rewrite tests/fixtures/llm_cassette.json"
+    )
+    parser.addoption(
+        "--llm",
+        action="store_true",
+        default=False,
+        help="Run the tests marked llm, and send cassette misses to a real model"
+    )
+
+def pytest_configure(config):
+    """Register the llm marker."""
+    config.addinivalue_line("markers", "llm: test loads or calls a real LLM")
+
+def pytest_collection_modifyitems(config, items):
+    """Mark every test needing a live model as llm, and skip llm tests unless enabled."""
+    run_llm = _llm_tests_enabled(config)
+    skip_llm = pytest.mark.skip(reason="needs a real LLM; run with --llm or TEAMPRISM_LLM_TESTS=1")
+    if run_llm and TEST_QUANTIZATION and TEST_BACKEND == "hf":
+        import torch
+        if not torch.cuda.is_available():
+            run_llm = False
+            skip_llm = pytest.mark.skip(
+                reason="TEAMPRISM_TEST_QUANTIZED=1 loads the model with bitsandbytes, which needs a CUDA GPU"
+            )
+    for item in items:
+        if any(name in getattr(item, "fixturenames", ()) for name in LIVE_FIXTURES):
+            item.add_marker(pytest.mark.llm)
+        if not run_llm and "llm" in item.keywords:
+            item.add_marker(skip_llm)
+
+@pytest.fixture(scope="session")
+def llm_cassette(request):
+    """Recorded model responses keyed by prompt and generation settings."""
+    record = request.config.getoption("--record")
+    cassette = {}
+    if CASSETTE_PATH.exists() and not record:
+        cassette = json.loads(CASSETTE_PATH.read_text(encoding="utf-8"))
+    
+    yield cassette
+    
+    if record:
+        CASSETTE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        CASSETTE_PATH.write_text(
+            json.dumps(cassette, indent=2, sort_keys=True, ensure_ascii=False) + "\n",
+            encoding="utf-8"
+        )
+
+def replay_from_cassette(interface, cassette, live):
+    """
+    Serve an interface's generate_batch calls from a cassette.
+    
+    Lookups happen before anything touches the model, so the weights are
+    only loaded for a prompt missing from the cassette. With a live model
+    (--llm or --record) a miss is generated and added to the cassette;
+    otherwise the test is skipped.
+    """
+    from src.models.cache import LLMCache
+    
+    generate_batch = interface.generate_batch
+    
+    def replay(prompts, max_tokens=None, temperature=None, deterministic=False, schema=None):
+        # Resolved as generate_batch does, so equal calls share an entry
+        max_tokens = max_tokens or interface.max_tokens
+        temperature = interface.temperature if temperature is None else temperature
+        greedy = deterministic or temperature == 0
+        keys = [
+            LLMCache.cache_key(
+                prompt,
+                model=interface.model_name,
+                max_tokens=max_tokens,
+                temperature=None if greedy else temperature,
+                **({} if schema is None else {"schema": schema.__name__})
+            )
+            for prompt in prompts
+        ]
+        missing = [i for i, key in enumerate(keys) if key not in cassette]
+        if missing and not live:
+            pytest.skip(f"response not recorded in {CASSETTE_PATH.name}; run with --llm or --record")
+        if missing:
+            generated = generate_batch([prompts[i] for i in missing], max_tokens, temperature, deterministic, schema)
+            for i, response in zip(missing, generated):
+                cassette[keys[i]] = response
+        return [cassette[key] for key in keys]
+    
+    interface.generate_batch = replay
 
 @pytest.fixture
 def sample_feedback_data():
@@ -35,10 +148,253 @@ def sample_csv_file(sample_feedback_data):
     yield file_path
     file_path.unlink(missing_ok=True)
 
+# Structural assertions do not need the large model; set
+# TEAMPRISM_TEST_MODEL=llama-3.1-8b to run the suite against the 8B
+TEST_MODEL = os.getenv("TEAMPRISM_TEST_MODEL", "llama-3.2-1b")
+# "hf" loads the model in-process; "vllm" or "ollama" send requests to a
+# server that batches concurrent test calls continuously
+TEST_BACKEND = os.getenv("TEAMPRISM_TEST_BACKEND", "hf")
+# Start a vLLM server for the session instead of using one already running
+TEST_START_SERVER = os.getenv("TEAMPRISM_TEST_START_SERVER", "0") == "1"
+# Tests only check the structure of responses, so TEAMPRISM_TEST_QUANTIZED=1
+# runs local models in 4-bit; this needs bitsandbytes and a CUDA GPU, so the
+# configured format is used by default
+TEST_QUANTIZATION = "nf4" if os.getenv("TEAMPRISM_TEST_QUANTIZED", "0") == "1" else None
+# Tests decode greedily by default, so every response is reproducible and
+# served from the response cache on repeat runs
+TEST_TEMPERATURE = float(os.getenv("TEAMPRISM_TEST_TEMPERATURE", "0"))
+
+def _test_model_key():
+    """Model configuration used by the tests, selected by TEAMPRISM_TEST_MODEL and TEAMPRISM_TEST_BACKEND."""
+    if TEST_BACKEND == "hf":
+        return TEST_MODEL
+    return f"{TEST_MODEL}-{TEST_BACKEND}"
+
+def _llm_tests_enabled(config):
+    """Whether tests marked llm run in this session."""
+    return RUN_LLM_TESTS or config.getoption("--llm") or config.getoption("--record")
+
+def _warm_page_cache(model_names):
+    """
+    Read the cached safetensors files of the given models once.
+    
+    The bytes land in the OS page cache, so from_pretrained later maps them
+    from memory instead of waiting on the disk.
+    """
+    from huggingface_hub.constants import HF_HUB_CACHE
+    
+    buffer = bytearray(4 << 20)
+    for model_name in model_names:
+        repo_dir = Path(HF_HUB_CACHE) / f"models--{model_name.replace('/', '--')}"
+        for path in repo_dir.glob("snapshots/*/*.safetensors"):
+            with open(path, "rb", buffering=0) as f:
+                while f.readinto(buffer):
+                    pass
+
+def pytest_sessionstart(session):
+    """
+    Prepare the model the LLM tests use.
+    
+    A local model's weight files are read into the page cache in the
+    background while tests are collected. With TEAMPRISM_TEST_START_SERVER
+    set, a vLLM server is started instead. Only the main process starts it,
+    before pytest-xdist spawns its workers, so parallel workers send their
+    requests to one server holding one copy of the weights, whose
+    continuous batching interleaves them.
+    """
+    config = session.config
+    config.inference_server = None
+    if hasattr(config, "workerinput") or not _llm_tests_enabled(config):
+        return
+    
+    workers = config.getoption("numprocesses", None)
+    if workers:
+        if TEST_BACKEND == "hf":
+            raise pytest.UsageError(
+                "Parallel LLM tests would load one model per worker; "
+                "set TEAMPRISM_TEST_BACKEND=vllm to share one server"
+            )
+        if config.getoption("--record"):
+            raise pytest.UsageError("--record cannot be combined with pytest-xdist workers")
+    
+    model_config = MODEL_CONFIGS[_test_model_key()]
+    if model_config.get("backend", "hf") == "hf":
+        model_names = [model_config["name"]]
+        if model_config.get("draft_model") and LLM_SPECULATIVE:
+            model_names.append(MODEL_CONFIGS[model_config["draft_model"]]["name"])
+        threading.Thread(target=_warm_page_cache, args=(model_names,), daemon=True).start()
+        return
+    if model_config.get("backend") != "vllm" or not TEST_START_SERVER:
+        return
+    
+    import httpx
+    
+    port = httpx.URL(model_config["base_url"]).port
+    server = subprocess.Popen([
+        sys.executable, "-m", "vllm.entrypoints.openai.api_server",
+        "--model", model_config["name"],
+        "--port", str(port),
+        "--enable-prefix-caching"
+    ])
+    config.inference_server = server
+    
+    # Wait for the server to finish loading the model
+    deadline = time.monotonic() + 600
+    while True:
+        try:
+            httpx.get(f"{model_config['base_url']}/models").raise_for_status()
+            break
+        except httpx.HTTPError:
+            if server.poll() is not None or time.monotonic() > deadline:
+                server.terminate()
+                raise RuntimeError("vLLM server failed to start")
+            time.sleep(2)
+
+def pytest_sessionfinish(session):
+    """Stop the vLLM server started by pytest_sessionstart."""
+    server = getattr(session.config, "inference_server", None)
+    if server is not None:
+        server.terminate()
+        server.wait()
+
+@pytest.fixture(scope="session")
+def test_model_key():
+    """Model configuration used by the tests, selected by TEAMPRISM_TEST_MODEL and TEAMPRISM_TEST_BACKEND."""
+    return _test_model_key()
+
+@pytest.fixture(scope="session")
+def inference_server(request):
+    """vLLM server process started for the session, if this process started one."""
+    return request.config.inference_server
+
+@pytest.fixture(scope="session")
+def llm_interface(request, test_model_key, inference_server, llm_cassette):
+    """Create an LLM interface instance shared by the whole test session."""
+    from src.models.cache import LLMCache
+    from src.models.llm import LLMInterface
+    
+    # A dedicated instance rather than LLMInterface.get, so the test cache,
+    # temperature and cassette never leak into the process-wide interface;
+    # the weights come from the model registry on the first cassette miss
+    live = _llm_tests_enabled(request.config)
+    interface = LLMInterface(test_model_key, quantization=TEST_QUANTIZATION)
+    interface.cache = LLMCache(cache_dir=str(CACHE_DIR)) if live else None
+    interface.temperature = TEST_TEMPERATURE
+    replay_from_cassette(interface, llm_cassette, live)
+    return interface
+
+@pytest.fixture
+def uncached_llm(llm_interface, test_model_key):
+    """Local interface without cassette replay or response cache, sharing the session's weights."""
+    from src.models.llm import LLMInterface
+    
+    if llm_interface.remote is not None:
+        pytest.skip("needs a local model")
+    interface = LLMInterface(test_model_key, quantization=TEST_QUANTIZATION)
+    interface.cache = None
+    return interface
+
+@pytest.fixture(scope="session")
+def test_temperature():
+    """Sampling temperature of the test interface, selected by TEAMPRISM_TEST_TEMPERATURE."""
+    return TEST_TEMPERATURE
+
+@pytest.fixture(scope="session")
+def generation_prompt():
+    """Free-form prompt used by the generation test."""
+    return "What is the capital of France?"
+
+@pytest.fixture(scope="session")
+def generation_max_tokens():
+    """Token budget for the generation test, which only checks the response is non-empty."""
+    return 8
+
+@pytest.fixture(scope="session")
+def class_feedback():
+    """Class-level feedback data used by the LLM tests."""
+    return {
+        'Group A': {
+            'students': ['Student 1', 'Student 2'],
+            'feedback': ['Great work!', 'Good job!']
+        },
+        'Group B': {
+            'students': ['Student 3', 'Student 4'],
+            'feedback': ['Excellent!', 'Well done!']
+        }
+    }
+
+@pytest.fixture(scope="session")
+def group_feedback():
+    """Group-level feedback data used by the LLM tests."""
+    return {
+        'students': ['Student 1', 'Student 2'],
+        'feedback': ['Great work!', 'Good job!']
+    }
+
+@pytest.fixture(scope="session")
+def student_feedback():
+    """Student-level feedback data used by the LLM tests."""
+    return {
+        'student_name': 'Student 1',
+        'group_name': 'Group A',
+        'feedback': ['Great work!', 'Good job!']
+    }
+
+@pytest.fixture(scope="session")
+def evaluation_feedback():
+    """Feedback text evaluated by the LLM tests."""
+    return "Great work on the project! Your presentation was clear and well-structured."
+
+@pytest.fixture(scope="session")
+def analysis_cache(
+    llm_interface,
+    generation_prompt,
+    generation_max_tokens,
+    class_feedback,
+    group_feedback,
+    student_feedback,
+    evaluation_feedback
+):
+    """
+    Generate the responses to the model calls the LLM tests make, keyed by their full settings.
+    
+    The calls are made through the same public methods the tests use, so
+    every response is generated with the token budget, schema and decoding
+    mode the test asks for.
+    """
+    responses = {}
+    generate_response = llm_interface.generate_response
+    
+    def record(prompt, max_tokens=None, temperature=None, deterministic=False, schema=None):
+        response = generate_response(prompt, max_tokens, temperature, deterministic, schema)
+        responses[(prompt, max_tokens, temperature, deterministic, schema)] = response
+        return response
+    
+    llm_interface.generate_response = record
+    try:
+        # The generation test only checks for a non-empty response, so its budget is capped
+        llm_interface.generate_response(generation_prompt, max_tokens=generation_max_tokens)
+        # One generation covers all three analysis tests: analyze_class_level,
+        # analyze_group_level and analyze_student_level return its sections
+        llm_interface.analyze_all(class_feedback, group_feedback, student_feedback, framework='ICAP')
+        llm_interface.evaluate_feedback(evaluation_feedback)
+    finally:
+        del llm_interface.generate_response
+    return responses
+
 @pytest.fixture
-def llm_interface():
-    """Create an LLM interface instance for testing."""
-    return LLMInterface(model_key="llama-3.1-8b")
+def cached_llm(llm_interface, analysis_cache, monkeypatch):
+    """LLM interface that answers the prefetched test calls from analysis_cache."""
+    generate_response = llm_interface.generate_response
+    
+    def lookup(prompt, max_tokens=None, temperature=None, deterministic=False, schema=None):
+        key = (prompt, max_tokens, temperature, deterministic, schema)
+        if key in analysis_cache:
+            return analysis_cache[key]
+        return generate_response(prompt, max_tokens, temperature, deterministic, schema)
+    
+    monkeypatch.setattr(llm_interface, "generate_response", lookup)
+    return llm_interface
 
 @pytest.fixture
 def data_loader():
@@ -46,11 +402,16 @@ def data_loader():
     return DataLoader()
 
 @pytest.fixture
-def feedback_evaluator():
+def feedback_evaluator(llm_interface):
     """Create a feedback evaluator instance for testing."""
-    return FeedbackEvaluator()
+    from src.models.evaluator import FeedbackEvaluator
+    
+    return FeedbackEvaluator(llm=llm_interface)
 
 @pytest.fixture
-def feedback_analyzer():
+def feedback_analyzer(test_model_key, llm_interface):
     """Create a feedback analyzer instance for testing."""
-    return FeedbackAnalyzer(model_key="llama-3.1-8b") 
\ No newline at end of file
+    from src.analysis.analyzer import FeedbackAnalyzer
+    
+    # Shares the session interface, including its cassette replay
+    return FeedbackAnalyzer(model_key=test_model_key, llm=llm_interface)
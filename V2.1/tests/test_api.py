@@ -35,6 +35,7 @@ def test_upload_feedback(sample_csv_file):
     assert response.status_code == 200
     assert "message" in response.json()
 
+@pytest.mark.llm
 def test_class_analysis(sample_csv_file):
     """Test class-level analysis endpoint."""
     response = client.get(
@@ -54,6 +55,7 @@ def test_class_analysis(sample_csv_file):
     assert "llm_analysis" in analysis
     assert "model_used" in analysis
 
+@pytest.mark.llm
 def test_group_analysis(sample_csv_file):
     """Test group-level analysis endpoint."""
     response = client.get(
@@ -75,6 +77,7 @@ def test_group_analysis(sample_csv_file):
     assert "model_used" in analysis
     assert analysis["statistics"]["group_name"] == "Group A"
 
+@pytest.mark.llm
 def test_student_analysis(sample_csv_file):
     """Test student-level analysis endpoint."""
     response = client.get(
@@ -99,6 +102,7 @@ def test_student_analysis(sample_csv_file):
     assert "model_used" in analysis
     assert analysis["student_data"]["student_name"] == "Student 1"
 
+@pytest.mark.llm
 def test_compare_feedback(sample_csv_file):
     """Test feedback comparison endpoint."""
     response = client.get(
@@ -117,4 +121,34 @@ def test_compare_feedback(sample_csv_file):
     comparison = response.json()
     assert "student_analysis" in comparison
     assert "comparison" in comparison
-    assert "model_used" in comparison 
\ No newline at end of file
+    assert "model_used" in comparison
+
+@pytest.mark.llm
+def test_compare_feedback_with_references(sample_csv_file):
+    """Test that reference texts reach the BERTScore evaluation."""
+    response = client.get(
+        "/api/v1/compare-feedback",
+        params={
+            "files": [str(sample_csv_file)],
+            "group_name": "Group A",
+            "student_name": "Student 1",
+            "references": ["Well done on the project overall."]
+        }
+    )
+    assert response.status_code == 200
+    results = response.json()["student_analysis"]["evaluation_results"]
+    assert all("bertscore" in result for result in results) 
+
+def test_compare_feedback_rejects_mismatched_references(sample_csv_file):
+    """Test that references not matching the feedback entries are a client error."""
+    response = client.get(
+        "/api/v1/compare-feedback",
+        params={
+            "files": [str(sample_csv_file)],
+            "group_name": "Group A",
+            "student_name": "Student 1",
+            "references": ["Well done on the project.", "Second reference without a feedback entry."]
+        }
+    )
+    assert response.status_code == 422
+    assert "2 references for 1 feedback entries" in response.json()["detail"]
@@ -0,0 +1,74 @@
+"""
+Tests for the remote inference backends.
+"""
+import json
+import httpx
+import pytest
+from src.models.backends import RemoteBackend
+from src.models.schemas import FeedbackEvaluation
+
+EVALUATION_CONTENT = json.dumps({
+    "score": 72,
+    "justification": "Specific and actionable, but cites little evidence.",
+    "criterion_scores": {
+        "specificity": 80,
+        "constructiveness": 75,
+        "actionability": 70,
+        "alignment": 65,
+        "evidence": 55
+    }
+})
+
+@pytest.fixture
+def remote_requests():
+    """Payloads of the requests sent to the mock server."""
+    return []
+
+@pytest.fixture
+def remote_backend(remote_requests):
+    """A backend whose requests are answered by an in-process mock server."""
+    def handler(request):
+        remote_requests.append((request.url.path, json.loads(request.content)))
+        return httpx.Response(200, json={
+            "choices": [{"message": {"role": "assistant", "content": EVALUATION_CONTENT}}]
+        })
+
+    backend = RemoteBackend(
+        "test-model",
+        "http://inference.test/v1/",
+        transport=httpx.MockTransport(handler)
+    )
+    yield backend
+    backend.close()
+
+def test_generate_batch_with_schema(remote_backend, remote_requests):
+    """Test that a schema is sent as a json_schema response format and the response parses."""
+    schema = FeedbackEvaluation.model_json_schema()
+    responses = remote_backend.generate_batch(["first", "second"], 64, 0.0, json_schema=schema)
+
+    assert len(responses) == 2
+    for response in responses:
+        evaluation = FeedbackEvaluation.model_validate_json(response)
+        assert evaluation.score == 72
+        assert evaluation.criterion_scores.evidence == 55
+
+    assert len(remote_requests) == 2
+    assert sorted(payload["messages"][0]["content"] for _, payload in remote_requests) == ["first", "second"]
+    path, payload = remote_requests[0]
+    assert path == "/v1/chat/completions"
+    assert payload["model"] == "test-model"
+    assert payload["messages"][0]["role"] == "user"
+    assert payload["max_tokens"] == 64
+    assert payload["temperature"] == 0.0
+    assert payload["response_format"] == {
+        "type": "json_schema",
+        "json_schema": {"name": "FeedbackEvaluation", "schema": schema}
+    }
+
+def test_generate_batch_without_schema(remote_backend, remote_requests):
+    """Test that free-form requests carry no response format."""
+    assert remote_backend.generate_batch(["prompt"], 16, 0.7) == [EVALUATION_CONTENT]
+
+    _, payload = remote_requests[0]
+    assert "response_format" not in payload
+    assert payload["temperature"] == 0.7
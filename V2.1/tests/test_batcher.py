@@ -0,0 +1,151 @@
+"""
+Tests for the dynamic request batcher.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.models.batcher import RequestBatcher
+
+class StubGenerator:
+    """Blocking generate_batch stand-in that records every call."""
+
+    def __init__(self, release=None):
+        self.calls = []
+        self.release = release
+
+    def __call__(self, prompts, **generate_kwargs):
+        self.calls.append((list(prompts), generate_kwargs))
+        if self.release is not None:
+            self.release.wait()
+        if generate_kwargs.get("temperature") == -1:
+            raise ValueError("bad temperature")
+        return [f"{prompt}:{generate_kwargs.get('temperature')}" for prompt in prompts]
+
+async def _submit_all(batcher, requests):
+    """Submit (prompt, kwargs) pairs concurrently and gather their outcomes."""
+    return await asyncio.gather(
+        *(batcher.submit(prompt, **kwargs) for prompt, kwargs in requests),
+        return_exceptions=True
+    )
+
+def test_requests_grouped_by_generation_settings():
+    """Test that concurrent requests share a call only when their settings match."""
+    generator = StubGenerator()
+
+    async def scenario():
+        batcher = RequestBatcher(generator, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        results = await _submit_all(batcher, [
+            ("a", {"temperature": 0.0}),
+            ("b", {"temperature": 0.7}),
+            ("c", {"temperature": 0.0})
+        ])
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(scenario()) == ["a:0.0", "b:0.7", "c:0.0"]
+    assert sorted(generator.calls) == [
+        (["a", "c"], {"temperature": 0.0}),
+        (["b"], {"temperature": 0.7})
+    ]
+
+def test_batches_capped_at_max_batch_size():
+    """Test that a burst of requests is split into calls of at most max_batch_size prompts."""
+    generator = StubGenerator()
+
+    async def scenario():
+        batcher = RequestBatcher(generator, max_batch_size=2, max_wait_ms=50)
+        await batcher.start()
+        results = await _submit_all(batcher, [(str(i), {}) for i in range(5)])
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [f"{i}:None" for i in range(5)]
+    assert [len(prompts) for prompts, _ in generator.calls] == [2, 2, 1]
+
+def test_batch_sent_when_wait_expires():
+    """Test that a request arriving after the wait window goes into a new call."""
+    generator = StubGenerator()
+
+    async def scenario():
+        batcher = RequestBatcher(generator, max_batch_size=8, max_wait_ms=10)
+        await batcher.start()
+        first = asyncio.ensure_future(batcher.submit("early"))
+        await asyncio.sleep(0.2)
+        second = await batcher.submit("late")
+        results = [await first, second]
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(scenario()) == ["early:None", "late:None"]
+    assert [prompts for prompts, _ in generator.calls] == [["early"], ["late"]]
+
+def test_errors_reach_only_their_batch():
+    """Test that a failing call fails its own requests and leaves other batches alone."""
+    generator = StubGenerator()
+
+    async def scenario():
+        batcher = RequestBatcher(generator, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        results = await _submit_all(batcher, [
+            ("bad", {"temperature": -1}),
+            ("good", {"temperature": 0.0})
+        ])
+        await batcher.stop()
+        return results
+
+    bad, good = asyncio.run(scenario())
+    assert isinstance(bad, ValueError)
+    assert good == "good:0.0"
+
+def test_stop_fails_in_flight_and_queued_requests():
+    """Test that stop() fails every pending request instead of leaving it waiting."""
+    release = threading.Event()
+    generator = StubGenerator(release)
+
+    async def scenario():
+        batcher = RequestBatcher(generator, max_batch_size=1, max_wait_ms=0)
+        await batcher.start()
+        in_flight = asyncio.ensure_future(batcher.submit("in flight"))
+        while not generator.calls:
+            await asyncio.sleep(0.01)
+        queued = asyncio.ensure_future(batcher.submit("queued"))
+        await asyncio.sleep(0.01)
+
+        await batcher.stop()
+        assert not batcher.is_running
+        results = await asyncio.gather(in_flight, queued, return_exceptions=True)
+        # Let the blocked worker thread finish so asyncio.run can shut down
+        release.set()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert [prompts for prompts, _ in generator.calls] == [["in flight"]]
+
+def test_threadsafe_submitters_outnumbering_executor_workers():
+    """Test that callers blocking the default executor cannot starve the batch they wait for."""
+    generator = StubGenerator()
+    workers = 2
+
+    async def scenario():
+        # Endpoints call the LLM through asyncio.to_thread, so every waiting
+        # submit_threadsafe caller holds one of the default executor's threads
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+        batcher = RequestBatcher(generator, max_batch_size=8, max_wait_ms=20)
+        await batcher.start()
+        results = await asyncio.wait_for(asyncio.gather(*(
+            asyncio.to_thread(batcher.submit_threadsafe, str(i))
+            for i in range(4 * workers)
+        )), timeout=5)
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [f"{i}:None" for i in range(8)]
+
+def test_submit_requires_running_batcher():
+    """Test that submitting before start() is rejected."""
+    batcher = RequestBatcher(StubGenerator())
+    with pytest.raises(RuntimeError):
+        asyncio.run(batcher.submit("prompt"))
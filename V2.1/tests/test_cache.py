@@ -0,0 +1,51 @@
+"""
+Tests for the LLM response cache.
+"""
+import zlib
+import numpy as np
+import pytest
+from src.config.prompts import class_level_prompt, group_level_prompt, evaluation_prompt
+from src.models.cache import LLMCache
+
+PARAMS = {"model": "test-model", "max_tokens": 64, "greedy": True}
+
+class BagOfWordsEncoder:
+    """Stand-in for the sentence-transformers model: normalized hashed word counts."""
+
+    def encode(self, text, normalize_embeddings=True):
+        vector = np.zeros(512)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode("utf-8")) % len(vector)] += 1
+        return vector / np.linalg.norm(vector)
+
+@pytest.fixture
+def semantic_cache():
+    """Memory-only cache with the semantic tier enabled."""
+    cache = LLMCache(max_size=16, redis_url=None, similarity_threshold=0.92, cache_dir=None)
+    cache._encoder = BagOfWordsEncoder()
+    return cache
+
+def test_semantic_hit_for_similar_prompt(semantic_cache):
+    """Test that a prompt differing only in formatting reuses the earlier response."""
+    semantic_cache.set("What is the capital of France?", "Paris", **PARAMS)
+    assert semantic_cache.get("what is the capital of france?", **PARAMS) == "Paris"
+
+def test_different_feedback_evaluations_do_not_collide(semantic_cache):
+    """Test that evaluations sharing the long template text are compared by their feedback only."""
+    first = evaluation_prompt(feedback_text="Great work on the project! Your presentation was clear.")
+    second = evaluation_prompt(feedback_text="The report misses its deadline and most required sections.")
+    semantic_cache.set(first, '{"score": 85}', **PARAMS)
+
+    assert semantic_cache.get(second, **PARAMS) is None
+    assert semantic_cache.get(first, **PARAMS) == '{"score": 85}'
+
+def test_templates_do_not_share_semantic_entries(semantic_cache):
+    """Test that the same data filled into different templates is never a semantic hit."""
+    data = '{"students":["Student 1"],"feedback":["Great work!"]}'
+    semantic_cache.set(class_level_prompt(feedback_data=data), "class analysis", **PARAMS)
+    assert semantic_cache.get(group_level_prompt(group_data=data), **PARAMS) is None
+
+def test_semantic_hits_respect_generation_settings(semantic_cache):
+    """Test that responses generated with other settings are not reused."""
+    semantic_cache.set("What is the capital of France?", "Paris", **PARAMS)
+    assert semantic_cache.get("What is the capital of France?", **{**PARAMS, "max_tokens": 8}) is None
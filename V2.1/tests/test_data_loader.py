@@ -1,9 +1,11 @@
 """
 Tests for the data loader component.
 """
+import json
 import pytest
 import pandas as pd
-from src.data.loader import DataLoader
+from collections.abc import Mapping
+from src.data.loader import DataLoader, ProcessedFeedback, serialize_feedback
 
 def test_load_csv(sample_csv_file, data_loader):
     """Test loading a CSV file."""
@@ -84,4 +86,94 @@ def test_get_student_data(sample_feedback_data, data_loader):
     assert 'student_name' in student_data
     assert 'group_name' in student_data
     assert 'feedback' in student_data
-    assert len(student_data['feedback']) == 1 
\ No newline at end of file
+    assert len(student_data['feedback']) == 1 
+
+def test_serialize_feedback_with_dates(sample_feedback_data, data_loader):
+    """Test serializing group and student data whose dates are date objects."""
+    # The pyarrow CSV engine parses ISO dates into datetime.date values
+    sample_feedback_data['date'] = pd.to_datetime(sample_feedback_data['date']).dt.date
+    processed = data_loader.preprocess_feedback_data(
+        sample_feedback_data,
+        group_col='group',
+        student_col='student',
+        feedback_col='feedback',
+        date_col='date'
+    )
+    
+    group_data = json.loads(serialize_feedback(processed['Group A']))
+    assert group_data['Student 1']['dates'] == ['2024-01-01']
+    
+    student_data = data_loader.get_student_data(processed, 'Group A', 'Student 2')
+    assert json.loads(serialize_feedback(student_data))['dates'] == ['2024-01-02']
+
+@pytest.fixture
+def processed_feedback(sample_feedback_data, data_loader):
+    """Preprocessed sample feedback, with dates."""
+    return data_loader.preprocess_feedback_data(sample_feedback_data, date_col='date')
+
+def test_processed_feedback_mapping(processed_feedback):
+    """Test that the store behaves as a read-only {group: {student: record}} mapping."""
+    assert isinstance(processed_feedback, Mapping)
+    assert len(processed_feedback) == 2
+    assert list(processed_feedback) == ['Group A', 'Group B']
+    assert 'Group A' in processed_feedback
+    assert 'Group C' not in processed_feedback
+    assert processed_feedback.get('Group C') is None
+    assert list(processed_feedback['Group B']) == ['Student 3', 'Student 4']
+    assert processed_feedback['Group A']['Student 1'] == {
+        'feedback': ['Great work on the project!'],
+        'feedback_count': 1,
+        'dates': ['2024-01-01']
+    }
+    with pytest.raises(KeyError):
+        processed_feedback['Group C']
+
+def test_processed_feedback_merge():
+    """Test that merging chunks concatenates the feedback of students present in several."""
+    first = ProcessedFeedback(['Group A', 'Group A'], ['Student 1', 'Student 2'], [['a'], ['b']], [['d1'], ['d2']])
+    second = ProcessedFeedback(['Group B', 'Group A'], ['Student 3', 'Student 1'], [['c'], ['d', 'e']], [['d3'], ['d4', 'd5']])
+    
+    merged = ProcessedFeedback.merge([first, second])
+    assert merged.to_dict() == {
+        'Group A': {
+            'Student 1': {'feedback': ['a', 'd', 'e'], 'feedback_count': 3, 'dates': ['d1', 'd4', 'd5']},
+            'Student 2': {'feedback': ['b'], 'feedback_count': 1, 'dates': ['d2']}
+        },
+        'Group B': {
+            'Student 3': {'feedback': ['c'], 'feedback_count': 1, 'dates': ['d3']}
+        }
+    }
+    assert list(merged) == ['Group A', 'Group B']
+    assert ProcessedFeedback.merge([first]) is first
+
+def test_processed_feedback_merge_without_dates():
+    """Test that dates are dropped unless every merged chunk has them."""
+    first = ProcessedFeedback(['Group A'], ['Student 1'], [['a']], [['d1']])
+    second = ProcessedFeedback(['Group A'], ['Student 1'], [['b']])
+    
+    merged = ProcessedFeedback.merge([first, second])
+    assert merged.date_lists is None
+    assert merged['Group A'] == {'Student 1': {'feedback': ['a', 'b'], 'feedback_count': 2}}
+
+def test_processed_feedback_chunks_match_whole_frame(sample_feedback_data, data_loader, processed_feedback):
+    """Test that preprocessing a frame in chunks gives the same store as all at once."""
+    chunks = iter([sample_feedback_data[:1], sample_feedback_data[1:3], sample_feedback_data[3:]])
+    chunked = data_loader.preprocess_feedback_data(chunks, date_col='date')
+    assert chunked.to_dict() == processed_feedback.to_dict()
+    
+    undated = data_loader.preprocess_feedback_data(iter([sample_feedback_data[:2], sample_feedback_data[2:]]))
+    assert 'dates' not in undated['Group A']['Student 1']
+
+def test_processed_feedback_to_json(processed_feedback):
+    """Test that the JSON round-trips to the nested dict the loader used to return."""
+    assert json.loads(processed_feedback.to_json()) == {
+        'Group A': {
+            'Student 1': {'feedback': ['Great work on the project!'], 'feedback_count': 1, 'dates': ['2024-01-01']},
+            'Student 2': {'feedback': ['Could improve documentation.'], 'feedback_count': 1, 'dates': ['2024-01-02']}
+        },
+        'Group B': {
+            'Student 3': {'feedback': ['Excellent presentation skills.'], 'feedback_count': 1, 'dates': ['2024-01-03']},
+            'Student 4': {'feedback': ['Needs more attention to detail.'], 'feedback_count': 1, 'dates': ['2024-01-04']}
+        }
+    }
+    assert processed_feedback.to_json() == serialize_feedback(processed_feedback.to_dict())
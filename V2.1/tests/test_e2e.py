@@ -36,6 +36,7 @@ def sample_csv_file(sample_feedback_data):
     yield file_path
     file_path.unlink(missing_ok=True)
 
+@pytest.mark.llm
 def test_end_to_end_workflow(sample_csv_file):
     """Test the complete workflow from data loading to analysis."""
     # 1. Test API health check
@@ -1,81 +1,200 @@
 """
 Tests for the LLM interface component.
 """
+import asyncio
+import json
+import re
 import pytest
+from pydantic import BaseModel
+from src.config.settings import MODEL_CONFIGS
+from src.config import prompts
+from src.config.prompts import evaluation_prompt
+from src.data.loader import serialize_feedback
+from src.models import schemas
 from src.models.llm import LLMInterface
 
-def test_llm_initialization(llm_interface):
+def test_llm_initialization(llm_interface, test_model_key, test_temperature):
     """Test LLM interface initialization."""
-    assert llm_interface.model_name == "meta-llama/Llama-3.1-8B-Instruct"
+    assert llm_interface.model_name == MODEL_CONFIGS[test_model_key]["name"]
     assert llm_interface.max_tokens == 512
-    assert llm_interface.temperature == 0.7
+    assert MODEL_CONFIGS[test_model_key]["temperature"] == 0.7
+    assert llm_interface.temperature == test_temperature
     assert llm_interface.context_length == 4096
 
-def test_generate_response(llm_interface):
+def test_generate_response(cached_llm, generation_prompt, generation_max_tokens):
     """Test generating a response from the LLM."""
-    prompt = "What is the capital of France?"
-    response = llm_interface.generate_response(prompt)
+    response = cached_llm.generate_response(generation_prompt, max_tokens=generation_max_tokens)
     assert isinstance(response, str)
     assert len(response) > 0
 
-def test_analyze_class_level(llm_interface, sample_feedback_data):
+def test_analyze_class_level(cached_llm, sample_feedback_data, class_feedback):
     """Test class-level analysis."""
-    processed_data = {
-        'Group A': {
-            'students': ['Student 1', 'Student 2'],
-            'feedback': ['Great work!', 'Good job!']
-        },
-        'Group B': {
-            'students': ['Student 3', 'Student 4'],
-            'feedback': ['Excellent!', 'Well done!']
-        }
-    }
-    
-    analysis = llm_interface.analyze_class_level(processed_data)
+    analysis = cached_llm.analyze_class_level(class_feedback)
     assert isinstance(analysis, dict)
-    assert 'summary' in analysis
-    assert 'key_insights' in analysis
-    assert 'recommendations' in analysis
+    assert 'overall_trends' in analysis
+    assert 'group_comparisons' in analysis
+    assert 'topic_analysis' in analysis
 
-def test_analyze_group_level(llm_interface):
+def test_analyze_group_level(cached_llm, group_feedback):
     """Test group-level analysis."""
-    group_data = {
-        'students': ['Student 1', 'Student 2'],
-        'feedback': ['Great work!', 'Good job!']
-    }
-    
-    analysis = llm_interface.analyze_group_level(group_data)
+    analysis = cached_llm.analyze_group_level(group_feedback)
     assert isinstance(analysis, dict)
-    assert 'group_summary' in analysis
-    assert 'student_performance' in analysis
+    assert 'group_dynamics' in analysis
+    assert 'contributions' in analysis
     assert 'improvement_areas' in analysis
 
-def test_analyze_student_level(llm_interface):
+def test_analyze_student_level(cached_llm, student_feedback):
     """Test student-level analysis."""
-    student_data = {
-        'student_name': 'Student 1',
-        'group_name': 'Group A',
-        'feedback': ['Great work!', 'Good job!']
-    }
-    
-    analysis = llm_interface.analyze_student_level(student_data, framework='ICAP')
+    analysis = cached_llm.analyze_student_level(student_feedback, framework='ICAP')
     assert isinstance(analysis, dict)
-    assert 'student_summary' in analysis
-    assert 'learning_style' in analysis
-    assert 'improvement_suggestions' in analysis
+    assert 'framework_analysis' in analysis
+    assert 'strengths' in analysis
+    assert 'recommendations' in analysis
 
-def test_evaluate_feedback(llm_interface):
+def test_evaluate_feedback(cached_llm, evaluation_feedback):
     """Test feedback evaluation."""
-    feedback = "Great work on the project! Your presentation was clear and well-structured."
-    evaluation = llm_interface.evaluate_feedback(feedback)
+    evaluation = cached_llm.evaluate_feedback(evaluation_feedback)
+    assert isinstance(evaluation, dict)
+    assert 'score' in evaluation
+    assert 'justification' in evaluation
+    assert 'criterion_scores' in evaluation
+
+@pytest.mark.asyncio
+async def test_async_analyses(
+    cached_llm,
+    class_feedback,
+    group_feedback,
+    student_feedback,
+    evaluation_feedback
+):
+    """Test running the analyses concurrently through the async methods."""
+    class_analysis, group_analysis, student_analysis, evaluation = await asyncio.gather(
+        cached_llm.aanalyze_class_level(class_feedback),
+        cached_llm.aanalyze_group_level(group_feedback),
+        cached_llm.aanalyze_student_level(student_feedback, framework='ICAP'),
+        cached_llm.aevaluate_feedback(evaluation_feedback)
+    )
+    assert isinstance(class_analysis, dict)
+    assert isinstance(group_analysis, dict)
+    assert isinstance(student_analysis, dict)
     assert isinstance(evaluation, dict)
-    assert 'quality_score' in evaluation
-    assert 'strengths' in evaluation
-    assert 'areas_for_improvement' in evaluation
+
+def test_analyze_all_memoizes_sections(
+    cached_llm,
+    class_feedback,
+    group_feedback,
+    student_feedback,
+    monkeypatch
+):
+    """Test that the per-level analyses reuse the sections of a combined analysis."""
+    results = cached_llm.analyze_all(class_feedback, group_feedback, student_feedback, framework='ICAP')
+    assert set(results) == {'class', 'group', 'student'}
+    assert 'overall_trends' in results['class']
+    assert 'group_dynamics' in results['group']
+    assert 'framework_analysis' in results['student']
+    
+    def generate_again(*args, **kwargs):
+        raise AssertionError("analysis was generated again instead of read from the memo")
+    
+    monkeypatch.setattr(cached_llm, "generate_response", generate_again)
+    assert cached_llm.analyze_class_level(class_feedback) == results['class']
+    assert cached_llm.analyze_group_level(group_feedback) == results['group']
+    assert cached_llm.analyze_student_level(student_feedback, framework='ICAP') == results['student']
+    # A different framework is a different analysis
+    with pytest.raises(AssertionError):
+        cached_llm.analyze_student_level(student_feedback, framework='SOLO')
+
+def test_speculative_decoding_matches_greedy(uncached_llm, generation_prompt):
+    """Test that decoding with a draft model leaves the greedy output unchanged."""
+    expected = uncached_llm.generate_response(generation_prompt, max_tokens=16, deterministic=True)
+    
+    # The model drafting for itself exercises assisted generation without a second download
+    uncached_llm.draft_model = uncached_llm.model
+    response = uncached_llm.generate_response(generation_prompt, max_tokens=16, deterministic=True)
+    assert response == expected
+
+@pytest.mark.llm
+@pytest.mark.parametrize("level", ["class", "group", "student", "evaluation"])
+def test_prefix_reuse_matches_full_prefill(
+    uncached_llm,
+    level,
+    class_feedback,
+    group_feedback,
+    student_feedback,
+    evaluation_feedback
+):
+    """Test that reusing the prompt prefix's KV cache leaves the greedy output unchanged."""
+    prompt = {
+        "class": lambda: prompts.class_level_prompt(feedback_data=serialize_feedback(class_feedback)),
+        "group": lambda: prompts.group_level_prompt(group_data=serialize_feedback(group_feedback)),
+        "student": lambda: prompts.student_level_prompt(
+            student_data=serialize_feedback(student_feedback),
+            framework='ICAP'
+        ),
+        "evaluation": lambda: evaluation_prompt(feedback_text=evaluation_feedback)
+    }[level]()
+    assert uncached_llm._match_prefix(prompt) is not None
+    
+    # A batch of two takes the padded path, which prefills the whole prompt
+    expected = uncached_llm._generate([prompt, prompt], 16, 0.0, greedy=True)[0]
+    
+    # Repeated lone calls must not see each other's completions in the shared cache
+    assert uncached_llm._generate([prompt], 16, 0.0, greedy=True) == [expected]
+    assert uncached_llm._generate([prompt], 16, 0.0, greedy=True) == [expected]
+
+@pytest.mark.llm
+def test_guided_json_follows_schema(uncached_llm, evaluation_feedback):
+    """Test that schema-guided decoding returns evaluations matching their schema, alone and batched."""
+    pytest.importorskip("outlines")
+    if uncached_llm._guided_model() is None:
+        pytest.skip("guided decoding is disabled by LLM_GUIDED_JSON=0")
+    
+    evaluations = [uncached_llm.evaluate_feedback(evaluation_feedback)]
+    evaluations += uncached_llm.evaluate_feedback_batch([evaluation_feedback, "Needs more detail."])
+    for evaluation in evaluations:
+        schemas.FeedbackEvaluation.model_validate(evaluation)
+
+def test_length_batches_ids_pad_like_tokenizing(uncached_llm, generation_prompt, evaluation_feedback):
+    """Test that padding the token ids counted for the length buckets gives the tokenizer's own inputs."""
+    prompts = [generation_prompt, evaluation_prompt(feedback_text=evaluation_feedback), generation_prompt]
+    for chunk, input_ids in uncached_llm._length_batches(prompts, [0, 1, 2]):
+        chunk_prompts = [prompts[i] for i in chunk]
+        expected = uncached_llm._tokenize(chunk_prompts)
+        padded = uncached_llm._tokenize(chunk_prompts, input_ids)
+        assert padded["input_ids"].tolist() == expected["input_ids"].tolist()
+        assert padded["attention_mask"].tolist() == expected["attention_mask"].tolist()
 
 def test_get_available_models():
     """Test getting available model configurations."""
     models = LLMInterface.get_available_models()
     assert isinstance(models, dict)
     assert 'llama-3.1-8b' in models
-    assert 'llama-3.2-1b' in models 
\ No newline at end of file
+    assert 'llama-3.2-1b' in models
+
+def _example_keys(example):
+    """Nested keys of a prompt's JSON example, None for leaves."""
+    return {
+        key: _example_keys(value) if isinstance(value, dict) and value else None
+        for key, value in example.items()
+    }
+
+def _schema_keys(schema):
+    """Nested field names of a response schema, None for leaves."""
+    return {
+        name: _schema_keys(field.annotation)
+        if isinstance(field.annotation, type) and issubclass(field.annotation, BaseModel) else None
+        for name, field in schema.model_fields.items()
+    }
+
+@pytest.mark.parametrize("template,schema", [
+    (prompts.class_level_prompt, schemas.ClassAnalysis),
+    (prompts.group_level_prompt, schemas.GroupAnalysis),
+    (prompts.student_level_prompt, schemas.StudentAnalysis),
+    (prompts.combined_analysis_prompt, schemas.CombinedAnalysis),
+    (prompts.evaluation_prompt, schemas.FeedbackEvaluation)
+])
+def test_prompt_format_matches_schema(template, schema):
+    """Test that each prompt asks for exactly the keys its guided-decoding schema enforces."""
+    tail = template.literals[-1]
+    example = re.sub(r":\s*(number|string)", ": null", tail[tail.index("{"):])
+    assert _example_keys(json.loads(example)) == _schema_keys(schema)
@@ -0,0 +1,83 @@
+"""
+Tests for the prompt templates.
+"""
+import re
+import pytest
+from src.config.prompts import (
+    PromptTemplate,
+    PROMPT_TEMPLATES,
+    ANALYSIS_SYSTEM_PREFIX,
+    CLASS_LEVEL_PROMPT,
+    GROUP_LEVEL_PROMPT,
+    STUDENT_LEVEL_PROMPT,
+    COMBINED_ANALYSIS_PROMPT,
+    EVALUATION_PROMPT
+)
+
+# Values with braces, as serialized feedback data has
+VALUES = {
+    "feedback_data": '{"Group A":{"Student 1":{"feedback":["Great work!"]}}}',
+    "group_data": '{"Student 1":{"feedback":["{curly} feedback"]}}',
+    "student_data": '{"feedback":["Uses {{double}} braces"],"dates":["2024-01-01"]}',
+    "framework": "ICAP",
+    "feedback_text": "Great work on {the} project!"
+}
+
+def format_reference(template, fields, **values):
+    """Fill a template with str.format after escaping every brace that is not a placeholder."""
+    pattern = "|".join(re.escape("{" + field + "}") for field in fields)
+    parts = re.split(f"({pattern})", template)
+    escaped = "".join(
+        part if i % 2 else part.replace("{", "{{").replace("}", "}}")
+        for i, part in enumerate(parts)
+    )
+    return escaped.format(**values)
+
+@pytest.mark.parametrize("text,fields", [
+    (CLASS_LEVEL_PROMPT, ["feedback_data"]),
+    (GROUP_LEVEL_PROMPT, ["group_data"]),
+    (STUDENT_LEVEL_PROMPT, ["student_data", "framework"]),
+    (COMBINED_ANALYSIS_PROMPT, ["feedback_data", "group_data", "student_data", "framework"]),
+    (EVALUATION_PROMPT, ["feedback_text"])
+])
+def test_templates_match_str_format(text, fields):
+    """Test that each template fills in like str.format, leaving its JSON braces intact."""
+    values = {field: VALUES[field] for field in fields}
+    prompt = PromptTemplate(text, *fields)(**values)
+
+    assert prompt == format_reference(text, fields, **values)
+    # The JSON examples keep their single braces
+    assert '{\n    "' in prompt
+
+def test_module_templates_match_their_text():
+    """Test that the prebuilt templates fill in like str.format on their prompt texts."""
+    texts = [CLASS_LEVEL_PROMPT, GROUP_LEVEL_PROMPT, STUDENT_LEVEL_PROMPT, COMBINED_ANALYSIS_PROMPT, EVALUATION_PROMPT]
+    for template, text in zip(PROMPT_TEMPLATES, texts):
+        values = {field: VALUES[field] for field in template.fields}
+        assert template(**values) == format_reference(text, template.fields, **values)
+
+def test_escaped_braces_are_literal():
+    """Test that doubled braces are kept as written rather than unescaped."""
+    text = 'Keep {{this}} and {"a": {}} but fill {name} and {name} again.'
+    template = PromptTemplate(text, "name")
+
+    assert template(name="{x}") == 'Keep {{this}} and {"a": {}} but fill {x} and {x} again.'
+    assert template(name="{x}") == format_reference(text, ["name"], name="{x}")
+    assert template.fields == ["name", "name"]
+
+def test_unlisted_placeholders_are_left_alone():
+    """Test that only the listed fields are substituted."""
+    template = PromptTemplate("{known} and {unknown}", "known")
+    assert template(known="value") == "value and {unknown}"
+    with pytest.raises(KeyError):
+        template()
+
+def test_match_recovers_values():
+    """Test that match returns the values a prompt was built with, and None for other prompts."""
+    for template in PROMPT_TEMPLATES:
+        values = {field: VALUES[field] for field in dict.fromkeys(template.fields)}
+        prompt = template(**values)
+        assert template.match(prompt) == [values[field] for field in template.fields]
+
+    assert PROMPT_TEMPLATES[0].match(ANALYSIS_SYSTEM_PREFIX) is None
+    assert PROMPT_TEMPLATES[-1].match("What is the capital of France?") is None